@@ -5,33 +5,177 @@ This module defines all HTTP endpoints for the label detection service,
 including file upload, processing, printing, and health checks.
 """
 
+import asyncio
 import base64
+import hashlib
+import json
 import logging
 import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from functools import lru_cache
 from io import BytesIO
-from typing import Dict, Any
+from pathlib import Path
+from typing import Dict, Any, Optional, BinaryIO, Iterator, Tuple, Union
 
 from fastapi import FastAPI, File, UploadFile, HTTPException, Form
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi.responses import JSONResponse, HTMLResponse, FileResponse, Response
 from fastapi.staticfiles import StaticFiles
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from config import settings
-from services.image_processing import image_processor, ImageProcessingError
-from services.printing import print_service, PrintingError
+# orjson is optional; fall back to the stdlib encoder when it isn't installed
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse as DefaultJSONResponse
+except ImportError:
+    orjson = None
+    DefaultJSONResponse = JSONResponse
+
+from config import (
+    get_settings, setup_logging, ensure_directories,
+    EMBED_JPEG_QUALITY, PNG_COMPRESS_LEVEL, STATIC_DIR, RESULTS_DIR, UPLOAD_CHUNK_SIZE, MULTIPART_OVERHEAD,
+    ALLOWED_EXTENSIONS
+)
+from services.image_processing import get_image_processor, ImageProcessingError
+from services.executor import run_blocking, shutdown_executor
+from services.inference import get_inference_service
+from services.printing import get_print_service, PrintingError
 
 
 logger = logging.getLogger(__name__)
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Manage resources that live for the duration of the server process."""
+    setup_logging(get_settings())
+    ensure_directories()
+    inference_service = get_inference_service()
+    await inference_service.warmup_async()
+    yield
+    await inference_service.aclose()
+    shutdown_executor()
+
+
 # Initialize FastAPI application
 app = FastAPI(
     title="LineCook Label Detection API",
     version="1.0.0",
-    description="API for detecting and extracting shipping labels from images and PDFs"
+    description="API for detecting and extracting shipping labels from images and PDFs",
+    default_response_class=DefaultJSONResponse,
+    lifespan=lifespan
 )
 
+
+UPLOAD_TOO_LARGE = "Upload exceeds maximum allowed size"
+
+
+def _json_dumps(content: Any) -> bytes:
+    """Serialize content the same way the default response class does."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+# Fixed 413 body, serialized once; it is sent before the app gets the request
+_UPLOAD_TOO_LARGE_BODY = _json_dumps({"detail": UPLOAD_TOO_LARGE})
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Reject oversized request bodies while they are being received.
+    
+    FastAPI parses multipart bodies before dependencies run, so this check has
+    to happen at the ASGI layer to avoid receiving and spooling the upload.
+    Requests that declare a Content-Length over the limit are turned away
+    before any of the body is read. Bodies without a Content-Length (chunked
+    uploads) are counted as they arrive and cut off with a 413 once they
+    cross the limit.
+    """
+    
+    def __init__(self, app: ASGIApp, max_body_size: Optional[int] = None):
+        """
+        Args:
+            app: ASGI application to wrap
+            max_body_size: Request body limit in bytes; defaults to
+                settings.max_file_size plus MULTIPART_OVERHEAD, read on each request
+        """
+        self.app = app
+        self._max_body_size = max_body_size
+    
+    @property
+    def max_body_size(self) -> int:
+        if self._max_body_size is not None:
+            return self._max_body_size
+        return get_settings().max_file_size + MULTIPART_OVERHEAD
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        
+        max_body_size = self.max_body_size
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                if value.isdigit() and int(value) > max_body_size:
+                    await self._reject(scope, receive, send)
+                    return
+                break
+        
+        received = 0
+        response_started = False
+        
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_body_size:
+                    # Raised inside the body parser; FastAPI passes HTTPException
+                    # through to its handler, which sends the 413
+                    raise HTTPException(status_code=413, detail=UPLOAD_TOO_LARGE)
+            return message
+        
+        async def tracked_send(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+        
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except HTTPException as e:
+            # Routes that read the body outside FastAPI's request handling
+            if e.status_code != 413 or response_started:
+                raise
+            await self._reject(scope, receive, send)
+    
+    @staticmethod
+    async def _reject(scope: Scope, receive: Receive, send: Send) -> None:
+        response = Response(
+            content=_UPLOAD_TOO_LARGE_BODY, status_code=413, media_type="application/json"
+        )
+        await response(scope, receive, send)
+
+
+app.add_middleware(UploadSizeLimitMiddleware)
+
 # Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+
+@lru_cache(maxsize=1)
+def _index_html() -> Optional[bytes]:
+    """Read the web interface once, on first request, so GET / is served from memory."""
+    try:
+        return (STATIC_DIR / "index.html").read_bytes()
+    except FileNotFoundError:
+        logger.warning("Web interface not found at %s", STATIC_DIR / "index.html")
+        return None
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -41,23 +185,262 @@ async def web_interface():
     
     Returns the HTML page that provides a user-friendly interface for
     uploading files, processing labels, and downloading results.
+    The page is read once, on the first request; restart the server to pick up edits.
     """
-    try:
-        with open("static/index.html", "r", encoding="utf-8") as f:
-            html_content = f.read()
-        return HTMLResponse(content=html_content)
-    except FileNotFoundError:
+    index_html = _index_html()
+    if index_html is None:
         raise HTTPException(
             status_code=500, 
             detail="Web interface not found. Please ensure static/index.html exists."
         )
+    return HTMLResponse(content=index_html)
+
+
+# Monotonic deadline for the next expired-results sweep and the lock guarding it
+_next_results_prune = 0.0
+_results_prune_lock = threading.Lock()
+
+
+def _prune_results() -> None:
+    """
+    Remove cropped labels older than the configured results TTL.
+    
+    Runs on every stored label, but the directory is scanned at most once per
+    tenth of the TTL; concurrent callers skip the sweep rather than wait on it.
+    """
+    global _next_results_prune
+    if time.monotonic() < _next_results_prune or not _results_prune_lock.acquire(blocking=False):
+        return
+    try:
+        results_ttl = get_settings().results_ttl
+        _next_results_prune = time.monotonic() + max(1.0, results_ttl / 10)
+        cutoff = time.time() - results_ttl
+        for entry in os.scandir(RESULTS_DIR):
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.unlink(entry.path)
+            except FileNotFoundError:
+                # Removed by another worker process between scandir and unlink
+                continue
+            except OSError as e:
+                logger.warning("Could not remove expired result %s: %s", entry.path, e)
+    finally:
+        _results_prune_lock.release()
+
+
+def _copy_upload(source: BinaryIO, destination: BinaryIO, hasher: Optional[Any] = None) -> int:
+    """
+    Copy an upload to disk in bounded chunks, enforcing the maximum file size.
+    
+    A single buffer is reused for every chunk rather than allocating a new
+    bytes object per read.
+    
+    Args:
+        source: Upload file object to read from
+        destination: Open file to write to
+        hasher: Optional hashlib object updated with each chunk as it is copied
+        
+    Returns:
+        Number of bytes copied
+        
+    Raises:
+        HTTPException: If the upload exceeds the maximum file size (413)
+    """
+    settings = get_settings()
+    buffer = bytearray(UPLOAD_CHUNK_SIZE)
+    view = memoryview(buffer)
+    total = 0
+    while read := source.readinto(buffer):
+        total += read
+        if total > settings.max_file_size:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File exceeds maximum allowed size {settings.max_file_size} bytes"
+            )
+        destination.write(view[:read])
+        if hasher is not None:
+            hasher.update(view[:read])
+    return total
+
+
+# Recent results keyed by (upload digest, extension, label format) so
+# re-submitted files skip PDF rendering and inference. Entries hold the encoded
+# label as the response used it (PNG bytes, or the base64 JPEG inlined for
+# embed=true), its dimensions and the prediction rather than the decoded
+# image, and are budgeted by encoded size. Only touched from the event loop,
+# so no lock
+_result_cache: "OrderedDict[Tuple[bytes, str, str], Tuple[Union[bytes, str], Tuple[int, int], Dict[str, Any]]]" = OrderedDict()
+_result_cache_bytes = 0
+
+
+def _get_cached_result(
+    key: Tuple[bytes, str, str]
+) -> Optional[Tuple[Union[bytes, str], Tuple[int, int], Dict[str, Any]]]:
+    """Look up the encoded label, its size and prediction for a previously seen upload."""
+    result = _result_cache.get(key)
+    if result is not None:
+        _result_cache.move_to_end(key)
+    return result
+
+
+def _cache_result(
+    key: Tuple[bytes, str, str], 
+    label_data: Union[bytes, str], 
+    size: Tuple[int, int], 
+    best_pred: Dict[str, Any]
+) -> None:
+    """Remember a result, evicting the least recently used beyond result_cache_bytes."""
+    global _result_cache_bytes
+    budget = get_settings().result_cache_bytes
+    if len(label_data) > budget:
+        return
+    
+    previous = _result_cache.pop(key, None)
+    if previous is not None:
+        _result_cache_bytes -= len(previous[0])
+    _result_cache[key] = (label_data, size, best_pred)
+    _result_cache_bytes += len(label_data)
+    while _result_cache_bytes > budget:
+        _, (evicted, _, _) = _result_cache.popitem(last=False)
+        _result_cache_bytes -= len(evicted)
+
+
+def _store_result(png_data: bytes) -> str:
+    """
+    Save an encoded label into RESULTS_DIR so it can be served by /results.
+    
+    Args:
+        png_data: PNG bytes of the cropped label
+        
+    Returns:
+        Identifier of the stored label
+    """
+    _prune_results()
+    label_id = uuid.uuid4().hex
+    (RESULTS_DIR / f"{label_id}.png").write_bytes(png_data)
+    return label_id
+
+
+# Encode buffers reused across embed=true responses instead of allocating per
+# request; list append/pop are atomic, so pool threads can share it
+_encode_buffers: list[BytesIO] = []
+
+
+@contextmanager
+def _encode_buffer() -> Iterator[BytesIO]:
+    """
+    Borrow a reusable BytesIO from the pool, positioned at the start.
+    
+    Buffers are not truncated on return so their allocation is kept for the
+    next request; callers must only read up to their own write position.
+    """
+    try:
+        buffer = _encode_buffers.pop()
+    except IndexError:
+        buffer = BytesIO()
+    buffer.seek(0)
+    try:
+        yield buffer
+    finally:
+        # Keep at most two buffers per worker thread
+        if len(_encode_buffers) < 2 * get_settings().max_workers:
+            _encode_buffers.append(buffer)
+
+
+def _encode_png(image) -> bytes:
+    """Encode a PIL image as PNG bytes for printing."""
+    with _encode_buffer() as buffer:
+        image.save(buffer, format='PNG', compress_level=PNG_COMPRESS_LEVEL)
+        size = buffer.tell()
+        with buffer.getbuffer() as view:
+            return bytes(view[:size])
+
+
+def _b64encode(data: bytes) -> str:
+    """Base64 encode bytes for inlining in a JSON response."""
+    return base64.b64encode(data).decode('ascii')
+
+
+def _encode_jpeg_b64(image) -> str:
+    """Encode a PIL image as a base64 JPEG string for inlining in a response."""
+    with _encode_buffer() as buffer:
+        image.save(
+            buffer, format='JPEG', quality=EMBED_JPEG_QUALITY, optimize=False, progressive=False
+        )
+        size = buffer.tell()
+        with buffer.getbuffer() as view, view[:size] as jpeg_data:
+            return base64.b64encode(jpeg_data).decode('ascii')
+
+
+def _validate_upload_file(file: UploadFile) -> None:
+    """
+    Reject uploads with a missing filename or unsupported extension.
+    
+    Runs before the upload is copied to disk so invalid types are turned away
+    without any temp file or processing work.
+    
+    Raises:
+        HTTPException: If the filename is missing or its type is unsupported (400)
+    """
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="No filename provided")
+    
+    file_ext = Path(file.filename).suffix.lower()
+    if file_ext not in ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"File extension '{file_ext}' not allowed. "
+                   f"Supported extensions: {', '.join(ALLOWED_EXTENSIONS)}"
+        )
+
+
+async def _print_label(label: Union[str, bytes], filename: str) -> Dict[str, Any]:
+    """
+    Print a cropped label and describe the outcome for the API response.
+    
+    Args:
+        label: Path to the cropped PNG, or the encoded PNG bytes, to print
+        filename: Original upload filename, used for logging
+        
+    Returns:
+        Dictionary with print_attempted, print_success, print_message and,
+        on failure, print_error
+    """
+    print_service = get_print_service()
+    try:
+        if isinstance(label, bytes):
+            print_func = print_service.print_label_bytes
+        else:
+            print_func = print_service.print_label_file
+        print_success, print_message = await run_blocking(print_func, label)
+    except PrintingError as e:
+        logger.error("Print error for %s: %s", filename, e)
+        return {
+            "print_attempted": True,
+            "print_success": False,
+            "print_message": str(e),
+            "print_error": str(e)
+        }
+    
+    print_info: Dict[str, Any] = {
+        "print_attempted": True,
+        "print_success": print_success,
+        "print_message": print_message
+    }
+    if not print_success:
+        print_info["print_error"] = print_message
+        logger.warning("Print failed for %s: %s", filename, print_message)
+    else:
+        logger.info("Print succeeded for %s", filename)
+    return print_info
 
 
 @app.post("/create_labels")
 async def create_labels(
     file: UploadFile = File(...),
-    print_label: bool = Form(default=False)
-) -> JSONResponse:
+    print_label: bool = Form(default=False),
+    embed: bool = False
+) -> Response:
     """
     Process uploaded image/PDF file to detect and extract shipping labels.
     
@@ -68,129 +451,193 @@ async def create_labels(
     Args:
         file: Uploaded file (PDF, JPG, JPEG, or PNG)
         print_label: Optional flag to print the label if successful
+        embed: Query flag to inline the label as base64 instead of returning a URL
     
     Returns:
         JSON response with:
         - success: boolean indicating if label was found
         - message: descriptive message
         - label_dimensions: width/height of cropped label
-        - image_data: base64 encoded PNG of cropped label
+        - label_url: URL of the cropped PNG (unless embed is set)
+        - image_data: base64 encoded cropped label (only if embed is set)
+        - image_format: format of image_data, "jpeg", or "png" when the
+          label is also printed (only if embed is set)
         - confidence: detection confidence score
         - print_attempted: boolean if printing was requested
         - print_success: boolean if printing succeeded
         - print_message: printing status message
     
     Raises:
-        HTTPException: For validation errors (400) or processing errors (500)
+        HTTPException: For validation errors (400), oversized uploads (413)
+            or processing errors (500)
     """
-    if not file.filename:
-        raise HTTPException(status_code=400, detail="No filename provided")
+    _validate_upload_file(file)
     
     try:
-        # Read file content
-        file_content = await file.read()
-        logger.info(f"Processing uploaded file: {file.filename} ({len(file_content)} bytes)")
-        
-        # Process the file using the image processing service
+        # Stream the upload into a temporary file instead of buffering it in memory
+        suffix = Path(file.filename).suffix.lower()
+        hasher = hashlib.blake2b(digest_size=16)
         try:
-            cropped_image, result_path, best_pred = image_processor.process_uploaded_file(
-                file_content, file.filename
-            )
+            image_processor = get_image_processor()
+            with image_processor.temporary_file(suffix=suffix) as upload_path:
+                with open(upload_path, 'wb') as f:
+                    upload_size = await run_blocking(_copy_upload, file.file, f, hasher)
+                
+                # Embedded labels that aren't printed are inlined as JPEG; every
+                # other response is built from a PNG. Only the encoding the
+                # request needs is cached, so a hit returns the same format a
+                # miss would have produced
+                label_format = "jpeg" if embed and not print_label else "png"
+                cache_key = (hasher.digest(), suffix, label_format)
+                cached = _get_cached_result(cache_key)
+                cropped_image = None
+                label_data: Union[bytes, str, None] = None
+                if cached is not None:
+                    logger.info("Reusing cached result for %s (%d bytes)", file.filename, upload_size)
+                    label_data, label_size, best_pred = cached
+                else:
+                    logger.info("Processing uploaded file: %s (%d bytes)", file.filename, upload_size)
+                    
+                    # Process the file using the image processing service. PDFs
+                    # render and infer pages on the thread pool; images await
+                    # their single inference request on the event loop
+                    if suffix == ".pdf":
+                        cropped_image, message, best_pred = await run_blocking(
+                            image_processor.process_file, upload_path, file.filename
+                        )
+                    else:
+                        cropped_image, message, best_pred = (
+                            await image_processor.process_image_file_async(upload_path, file.filename)
+                        )
         except ImageProcessingError as e:
-            logger.warning(f"Image processing failed for {file.filename}: {str(e)}")
+            logger.warning("Image processing failed for %s: %s", file.filename, e)
             raise HTTPException(status_code=400, detail=str(e))
         
         # Check if label was found
-        if cropped_image is None:
-            logger.info(f"No labels detected in {file.filename}")
-            return JSONResponse(
-                status_code=404,
-                content={"success": False, "message": result_path}
+        if cropped_image is None and label_data is None:
+            logger.info("No labels detected in %s", file.filename)
+            return DefaultJSONResponse(
+                status_code=404, content={"success": False, "message": message}
             )
         
-        # Convert image to base64 for response
-        buffer = BytesIO()
-        cropped_image.save(buffer, format='PNG')
-        image_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+        if cropped_image is not None:
+            label_size = cropped_image.size
         
         # Build response data
         response_data: Dict[str, Any] = {
             "success": True,
             "message": "Label successfully detected and processed",
             "label_dimensions": {
-                "width": cropped_image.width,
-                "height": cropped_image.height
+                "width": label_size[0],
+                "height": label_size[1]
             },
-            "image_data": image_base64,
             "confidence": best_pred["confidence"] if best_pred else None
         }
         
-        # Handle printing if requested
-        if print_label:
-            try:
-                print_success, print_message = print_service.print_label_file(result_path)
-                response_data.update({
-                    "print_attempted": True,
-                    "print_success": print_success,
-                    "print_message": print_message
-                })
-                
-                if not print_success:
-                    response_data["print_error"] = print_message
-                    logger.warning(f"Print failed for {file.filename}: {print_message}")
-                else:
-                    logger.info(f"Print succeeded for {file.filename}")
-                    
-            except PrintingError as e:
-                logger.error(f"Print error for {file.filename}: {str(e)}")
-                response_data.update({
-                    "print_attempted": True,
-                    "print_success": False,
-                    "print_message": str(e),
-                    "print_error": str(e)
-                })
-        
-        # Clean up temporary file
-        try:
-            if result_path and os.path.exists(result_path):
-                os.unlink(result_path)
-                logger.debug(f"Cleaned up temporary file: {result_path}")
-        except Exception as e:
-            logger.warning(f"Could not clean up temporary file {result_path}: {str(e)}")
+        if label_format == "jpeg":
+            # JPEG is far cheaper to encode and smaller to inline than PNG
+            if label_data is None:
+                label_data = await run_blocking(_encode_jpeg_b64, cropped_image)
+                _cache_result(cache_key, label_data, label_size, best_pred)
+            response_data["image_format"] = "jpeg"
+            response_data["image_data"] = label_data
+        else:
+            png_data = label_data
+            if png_data is None:
+                # One lossless PNG serves /results, the printer and the result cache
+                png_data = await run_blocking(_encode_png, cropped_image)
+                _cache_result(cache_key, png_data, label_size, best_pred)
+            
+            # Encoding the embedded image doesn't depend on the print job, so start it
+            # now and let it run while the label prints
+            encode_task = None
+            label_path: Optional[Path] = None
+            if embed:
+                encode_task = asyncio.create_task(run_blocking(_b64encode, png_data))
+                response_data["image_format"] = "png"
+            else:
+                # Save the cropped PNG under RESULTS_DIR and return its URL
+                label_id = await run_blocking(_store_result, png_data)
+                label_path = RESULTS_DIR / f"{label_id}.png"
+                response_data["label_url"] = f"/results/{label_id}.png"
+            
+            # Handle printing if requested; embedded labels are never written to
+            # disk, their PNG is piped to the printer
+            if print_label:
+                label = png_data if embed else str(label_path)
+                response_data.update(await _print_label(label, file.filename))
+            
+            if encode_task is not None:
+                response_data["image_data"] = await encode_task
         
-        logger.info(f"Successfully processed {file.filename}")
-        return JSONResponse(content=response_data)
+        logger.info("Successfully processed %s", file.filename)
+        return DefaultJSONResponse(content=response_data)
         
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
     except Exception as e:
-        logger.error(f"Unexpected error processing {file.filename}: {str(e)}")
+        logger.error("Unexpected error processing %s: %s", file.filename, e)
         raise HTTPException(status_code=500, detail=f"Processing error: {str(e)}")
 
 
-@app.get("/health")
-async def health_check() -> Dict[str, Any]:
+@app.get("/results/{label_id}.png")
+async def get_result(label_id: str) -> FileResponse:
     """
-    Health check endpoint for service monitoring.
+    Serve a cropped label produced by /create_labels.
     
-    Returns:
-        Dictionary with service status and configuration information
+    Args:
+        label_id: Identifier returned in the label_url of a create_labels response
+        
+    Raises:
+        HTTPException: If the label does not exist or has expired (404)
     """
-    return {
+    try:
+        label_id = uuid.UUID(hex=label_id).hex
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Label not found")
+    
+    label_path = RESULTS_DIR / f"{label_id}.png"
+    if not label_path.is_file():
+        raise HTTPException(status_code=404, detail="Label not found")
+    return FileResponse(label_path, media_type="image/png")
+
+
+@lru_cache(maxsize=1)
+def _health_body() -> bytes:
+    """Serialize the health payload; settings only change on restart, so once is enough."""
+    settings = get_settings()
+    return _json_dumps({
         "status": "healthy",
         "api_configured": bool(settings.roboflow_api_key),
         "print_enabled": settings.print_enabled,
         "model_id": settings.model_id,
         "confidence_threshold": settings.confidence_thresh
-    }
+    })
+
+
+@app.get("/health")
+async def health_check() -> Response:
+    """
+    Health check endpoint for service monitoring.
+    
+    Returns:
+        JSON with service status and configuration information
+    """
+    return Response(content=_health_body(), media_type="application/json")
 
 
 @app.get("/print/status")
-async def print_status() -> Dict[str, Any]:
+async def print_status(refresh: bool = False) -> Dict[str, Any]:
     """
     Check print system status and configuration.
     
+    The system probe runs once and is cached; pass refresh=true to re-probe,
+    e.g. after adding a printer.
+    
+    Args:
+        refresh: Query flag to discard the cached setup and probe again
+    
     Returns:
         Dictionary with detailed print system information including:
         - Print configuration settings
@@ -198,10 +645,13 @@ async def print_status() -> Dict[str, Any]:
         - System information
         - Detected printers
     """
+    print_service = get_print_service()
     try:
-        return print_service.check_print_setup()
+        if refresh:
+            print_service.invalidate_setup()
+        return await run_blocking(print_service.get_cached_setup)
     except Exception as e:
-        logger.error(f"Error checking print status: {str(e)}")
+        logger.error("Error checking print status: %s", e)
         raise HTTPException(status_code=500, detail=f"Print status check failed: {str(e)}")
 
 
@@ -224,20 +674,20 @@ async def test_print() -> Dict[str, Any]:
         HTTPException: If test fails critically (500)
     """
     try:
-        result = print_service.test_print()
+        result = await run_blocking(get_print_service().test_print)
         
         if result["print_success"]:
             logger.info("Print test completed successfully")
         else:
-            logger.warning(f"Print test failed: {result.get('print_message', 'Unknown error')}")
+            logger.warning("Print test failed: %s", result.get('print_message', 'Unknown error'))
         
         return result
         
     except PrintingError as e:
-        logger.error(f"Print test failed: {str(e)}")
+        logger.error("Print test failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
-        logger.error(f"Unexpected error in print test: {str(e)}")
+        logger.error("Unexpected error in print test: %s", e)
         raise HTTPException(status_code=500, detail=f"Test print error: {str(e)}")
 
 
@@ -245,18 +695,16 @@ async def test_print() -> Dict[str, Any]:
 @app.exception_handler(ImageProcessingError)
 async def image_processing_error_handler(request, exc: ImageProcessingError):
     """Handle image processing errors with appropriate HTTP status codes."""
-    logger.warning(f"Image processing error: {str(exc)}")
-    return JSONResponse(
-        status_code=400,
-        content={"error": "Image processing failed", "detail": str(exc)}
+    logger.warning("Image processing error: %s", exc)
+    return DefaultJSONResponse(
+        status_code=400, content={"error": "Image processing failed", "detail": str(exc)}
     )
 
 
 @app.exception_handler(PrintingError)
 async def printing_error_handler(request, exc: PrintingError):
     """Handle printing errors with appropriate HTTP status codes."""
-    logger.warning(f"Printing error: {str(exc)}")
-    return JSONResponse(
-        status_code=500,
-        content={"error": "Printing failed", "detail": str(exc)}
+    logger.warning("Printing error: %s", exc)
+    return DefaultJSONResponse(
+        status_code=500, content={"error": "Printing failed", "detail": str(exc)}
     )
\ No newline at end of file
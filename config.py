@@ -6,6 +6,7 @@ a single source of truth for application behavior.
 """
 
 import logging
+from functools import lru_cache
 from pathlib import Path
 from typing import Tuple
 
@@ -16,15 +17,24 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 # Application constants
 TARGET_SIZE: Tuple[int, int] = (1200, 1800)  # 4x6 inch at 300 DPI
 TARGET_RATIOS: Tuple[float, float] = (4 / 6, 6 / 4)  # Standard shipping label ratios
-DEFAULT_DPI: int = 300
+DEFAULT_DPI: int = 300  # PDF render resolution for the cropped (printed) label
+DETECT_DPI: int = 150  # PDF render resolution for label detection
+CLI_MAX_WORKERS: int = 8  # Upper bound on parallel processes in CLI batch mode
+PDF_MAX_WORKERS: int = 4  # Upper bound on PDF pages rendered and inferred concurrently
+PRINT_SETUP_TTL: int = 60  # Seconds to reuse print system probe results
+WARMUP_TIMEOUT: float = 3.0  # Seconds server startup waits for inference API connections to warm up
+PNG_COMPRESS_LEVEL: int = 1  # Fast zlib level for short-lived API output; CLI outputs keep PIL's default
+EMBED_JPEG_QUALITY: int = 90  # JPEG quality for labels inlined in API responses
+INFER_JPEG_QUALITY: int = 85  # JPEG quality for images uploaded to the inference API
 MAX_FILE_SIZE: int = 50 * 1024 * 1024  # 50MB max file size
+UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # 1MB chunks when streaming uploads to disk
+MULTIPART_OVERHEAD: int = 64 * 1024  # Allowance for multipart boundaries and form fields
 ALLOWED_EXTENSIONS: set[str] = {".pdf", ".jpg", ".jpeg", ".png"}
 TEMP_DIR: Path = Path("tmp")
 OUTPUT_DIR: Path = Path("test_outputs")
-
-# Ensure directories exist
-TEMP_DIR.mkdir(exist_ok=True, parents=True)
-OUTPUT_DIR.mkdir(exist_ok=True, parents=True)
+STATIC_DIR: Path = Path("static")
+RESULTS_DIR: Path = OUTPUT_DIR / "results"  # Cropped labels served by the API
+INFERENCE_CACHE_DIR: Path = TEMP_DIR / "infer_cache"  # Cached inference API responses
 
 
 class Settings(BaseSettings):
@@ -85,11 +95,76 @@ class Settings(BaseSettings):
         description="Maximum allowed file upload size in bytes"
     )
     
+    # Results configuration
+    results_ttl: int = Field(
+        default=3600,
+        ge=0,
+        description="Seconds to keep cropped labels available under /results"
+    )
+    result_cache_bytes: int = Field(
+        default=64 * 1024 * 1024,
+        ge=0,
+        description="Memory budget, in bytes of encoded label, for cropped labels reused for identical re-uploads (0 disables)"
+    )
+    
     # API configuration
     api_timeout: int = Field(
         default=30,
         description="API request timeout in seconds"
     )
+    max_workers: int = Field(
+        default=4,
+        ge=1,
+        description="Maximum worker threads for blocking label processing in the API"
+    )
+    max_infer_edge: int = Field(
+        default=1024,
+        ge=0,
+        description="Longest image edge sent for inference; larger images are downscaled (0 disables)"
+    )
+    decode_processes: int = Field(
+        default=0,
+        ge=0,
+        description="Worker processes for decoding and encoding image files before async inference (0 uses threads)"
+    )
+    min_infer_pixels: int = Field(
+        default=64 * 64,
+        ge=0,
+        description="Images with fewer pixels than this are treated as having no label without calling the API"
+    )
+    max_concurrent_inferences: int = Field(
+        default=4,
+        ge=1,
+        description="Maximum inference API requests in flight at once, to avoid throttling"
+    )
+    inference_cache_size: int = Field(
+        default=1024,
+        ge=0,
+        description="Number of inference results cached on disk by image content (0 disables)"
+    )
+    inference_cache_dir: Path = Field(
+        default=INFERENCE_CACHE_DIR,
+        description="Directory holding cached inference results"
+    )
+    
+    # Server configuration
+    server_host: str = Field(
+        default="0.0.0.0",
+        description="Host interface for the API server"
+    )
+    server_port: int = Field(
+        default=8000,
+        description="Port for the API server"
+    )
+    server_workers: int = Field(
+        default=1,
+        ge=1,
+        description="Number of uvicorn worker processes"
+    )
+    access_log: bool = Field(
+        default=True,
+        description="Enable uvicorn per-request access logging"
+    )
 
 
 def setup_logging(settings: Settings) -> logging.Logger:
@@ -112,6 +187,18 @@ def setup_logging(settings: Settings) -> logging.Logger:
     return logging.getLogger(__name__)
 
 
-# Global settings instance
-settings = Settings()
-logger = setup_logging(settings)
\ No newline at end of file
+def ensure_directories() -> None:
+    """Create the working directories used for temporary files, outputs and caches."""
+    for directory in (TEMP_DIR, OUTPUT_DIR, RESULTS_DIR, get_settings().inference_cache_dir):
+        directory.mkdir(exist_ok=True, parents=True)
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    Get the application settings, loading them on first use.
+    
+    Returns:
+        Cached Settings instance
+    """
+    return Settings()
\ No newline at end of file
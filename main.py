@@ -13,16 +13,30 @@ Usage:
 """
 
 import logging
+import os
+import shutil
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Optional
 
-from PIL import Image
+from config import (
+    get_settings, setup_logging, ensure_directories, OUTPUT_DIR, ALLOWED_EXTENSIONS, CLI_MAX_WORKERS
+)
 
-from config import settings, logger, OUTPUT_DIR, ALLOWED_EXTENSIONS
-from services.inference import inference_service
-from services.image_processing import image_processor, ImageProcessingError
-from api.endpoints import app
+# Heavy modules (FastAPI, PIL, the inference client) are imported inside the
+# functions that need them so each mode only pays for its own dependencies
+
+
+logger = logging.getLogger(__name__)
+
+
+def __getattr__(name: str):
+    """Expose the FastAPI app lazily so `uvicorn main:app` keeps working."""
+    if name == "app":
+        from api.endpoints import app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def process_file_cli(file_path: Path) -> bool:
@@ -35,33 +49,31 @@ def process_file_cli(file_path: Path) -> bool:
     Returns:
         True if processing succeeded, False otherwise
     """
+    from services.image_processing import get_image_processor, ImageProcessingError
+    
     try:
-        logger.info(f"Processing {file_path.name}...")
-        
-        # Read file content
-        with open(file_path, 'rb') as f:
-            file_content = f.read()
+        logger.info("Processing %s...", file_path.name)
         
-        # Process the file
+        # Process the file in place; there's no need to copy it into memory
+        # or a temp file first
         try:
-            cropped_image, temp_path, best_pred = image_processor.process_uploaded_file(
-                file_content, file_path.name
+            cropped_image, message, best_pred = get_image_processor().process_file(
+                file_path, file_path.name
             )
         except ImageProcessingError as e:
-            logger.error(f"Processing failed for {file_path.name}: {str(e)}")
+            logger.error("Processing failed for %s: %s", file_path.name, e)
             return False
         
         if cropped_image is None:
-            logger.warning(f"❌ No labels detected in {file_path.name}")
+            logger.warning("❌ No labels detected in %s: %s", file_path.name, message)
             # Save original image to outputs for review if it's not a PDF
             if file_path.suffix.lower() != ".pdf":
                 try:
-                    original_image = Image.open(file_path).convert("RGB")
-                    output_path = OUTPUT_DIR / f"no_label_{file_path.stem}.png"
-                    original_image.save(output_path)
-                    logger.info(f"Saved original image for review: {output_path}")
-                except Exception as e:
-                    logger.warning(f"Could not save original image: {str(e)}")
+                    output_path = OUTPUT_DIR / f"no_label_{file_path.name}"
+                    shutil.copy2(file_path, output_path)
+                    logger.info("Saved original image for review: %s", output_path)
+                except OSError as e:
+                    logger.warning("Could not save original image: %s", e)
             return False
         
         # Determine output filename
@@ -76,21 +88,13 @@ def process_file_cli(file_path: Path) -> bool:
         # Save the cropped label
         cropped_image.save(output_path)
         
-        # Clean up temporary file
-        if temp_path:
-            try:
-                import os
-                os.unlink(temp_path)
-            except Exception as e:
-                logger.warning(f"Could not clean up temp file: {str(e)}")
-        
         confidence = best_pred.get("confidence", 0) if best_pred else 0
-        logger.info(f"✅ Saved label to {output_path} (confidence: {confidence:.3f})")
+        logger.info("✅ Saved label to %s (confidence: %.3f)", output_path, confidence)
         
         return True
         
     except Exception as e:
-        logger.error(f"Error processing {file_path.name}: {str(e)}")
+        logger.error("Error processing %s: %s", file_path.name, e)
         return False
 
 
@@ -108,37 +112,57 @@ def run_cli_mode():
     # Find input files
     input_dir = Path("test_inputs")
     if not input_dir.exists():
-        logger.error(f"Input directory {input_dir} does not exist")
+        logger.error("Input directory %s does not exist", input_dir)
         return
     
-    # Process all supported files
-    processed_files = 0
-    successful_files = 0
+    # Collect all supported files
+    file_paths = [
+        file_path for file_path in sorted(input_dir.iterdir())
+        if file_path.is_file() and file_path.suffix.lower() in ALLOWED_EXTENSIONS
+    ]
+    
+    if not file_paths:
+        logger.warning("No supported files found in %s", input_dir)
+        logger.info("Supported extensions: %s", ', '.join(ALLOWED_EXTENSIONS))
+        return
     
-    for file_path in input_dir.iterdir():
-        if file_path.is_file() and file_path.suffix.lower() in ALLOWED_EXTENSIONS:
-            processed_files += 1
-            if process_file_cli(file_path):
-                successful_files += 1
+    # Files are independent, so process them in parallel worker processes
+    max_workers = min(CLI_MAX_WORKERS, os.cpu_count() or 1, len(file_paths))
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=setup_logging,
+        initargs=(get_settings(),)
+    ) as executor:
+        results = list(executor.map(process_file_cli, file_paths))
     
-    if processed_files == 0:
-        logger.warning(f"No supported files found in {input_dir}")
-        logger.info(f"Supported extensions: {', '.join(ALLOWED_EXTENSIONS)}")
-    else:
-        logger.info(f"Processing complete: {successful_files}/{processed_files} files successful")
+    successful_files = sum(results)
+    logger.info("Processing complete: %d/%d files successful", successful_files, len(file_paths))
 
 
 def run_server_mode():
     """
     Run the application in server mode using uvicorn.
     """
+    settings = get_settings()
     try:
         import uvicorn
-        logger.info("Starting LineCook API server")
-        uvicorn.run(app, host="0.0.0.0", port=8000)
     except ImportError:
         logger.error("uvicorn is required for server mode. Install with: pip install uvicorn")
         sys.exit(1)
+    
+    logger.info("Starting LineCook API server")
+    # loop/http "auto" pick uvloop and httptools when installed (uvicorn[standard])
+    uvicorn.run(
+        "api.endpoints:app",
+        host=settings.server_host,
+        port=settings.server_port,
+        workers=settings.server_workers,
+        loop="auto",
+        http="auto",
+        backlog=2048,
+        access_log=settings.access_log,
+        log_config=None  # Keep the logging configured by setup_logging()
+    )
 
 
 def main():
@@ -147,6 +171,10 @@ def main():
     
     Determines whether to run in CLI or server mode based on command line arguments.
     """
+    settings = get_settings()
+    setup_logging(settings)
+    ensure_directories()
+    
     try:
         # Check if API key is configured
         if not settings.roboflow_api_key:
@@ -165,7 +193,7 @@ def main():
     except KeyboardInterrupt:
         logger.info("Application interrupted by user")
     except Exception as e:
-        logger.error(f"Application error: {str(e)}")
+        logger.error("Application error: %s", e)
         if settings.log_level.upper() == "DEBUG":
             logger.exception("Detailed error information:")
         sys.exit(1)
@@ -0,0 +1,43 @@
+"""
+Shared thread pool for blocking work in LineCook.
+
+PDF rendering, PIL decoding/encoding, inference cache file access and print
+jobs all block, so async code hands them to one bounded pool instead of the
+event loop's unbounded default executor.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, TypeVar
+
+from config import get_settings
+
+
+T = TypeVar("T")
+
+
+@lru_cache(maxsize=1)
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Get the shared pool for blocking work, creating it on first use.
+
+    Returns:
+        ThreadPoolExecutor bounded by settings.max_workers
+    """
+    return ThreadPoolExecutor(
+        max_workers=get_settings().max_workers,
+        thread_name_prefix="linecook"
+    )
+
+
+async def run_blocking(func: Callable[..., T], *args: Any) -> T:
+    """Run a blocking function on the shared thread pool."""
+    return await asyncio.get_running_loop().run_in_executor(get_executor(), func, *args)
+
+
+def shutdown_executor() -> None:
+    """Shut down the shared pool if it was started; queued work is cancelled."""
+    if get_executor.cache_info().currsize:
+        get_executor().shutdown(wait=False, cancel_futures=True)
+        get_executor.cache_clear()
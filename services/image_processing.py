@@ -5,27 +5,53 @@ This module handles all image manipulation operations including cropping,
 rotation, resizing, and file format conversions.
 """
 
+import asyncio
 import logging
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, Any, Union, Optional, ContextManager
 from contextlib import contextmanager
-from io import BytesIO
+from functools import lru_cache
 
 from PIL import Image
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
 
-from config import settings, TARGET_SIZE, DEFAULT_DPI, TEMP_DIR, ALLOWED_EXTENSIONS
+# pyvips renders PDFs in-process via libvips; fall back to pdf2image (poppler
+# subprocess) when it or libvips isn't installed
+try:
+    import pyvips
+except (ImportError, OSError):
+    pyvips = None
+
+from config import (
+    get_settings, TARGET_SIZE, DEFAULT_DPI, DETECT_DPI, PNG_COMPRESS_LEVEL, PDF_MAX_WORKERS, TEMP_DIR,
+    ALLOWED_EXTENSIONS
+)
+from services.executor import run_blocking
 
 
 logger = logging.getLogger(__name__)
 
+# File signatures checked by validate_file()
+JPEG_SIGNATURE = b"\xff\xd8\xff"
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PDF_SIGNATURE = b"%PDF-"
+
 
 class ImageProcessingError(Exception):
     """Custom exception for image processing errors."""
     pass
 
 
+def _discard_task(task: "asyncio.Future") -> None:
+    """Cancel a task whose result is no longer needed without leaving its error unretrieved."""
+    task.cancel()
+    # A task that already failed can't be cancelled; collect its exception so
+    # asyncio doesn't log "Task exception was never retrieved"
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+
 class ImageProcessor:
     """
     Service for handling image processing operations.
@@ -39,10 +65,10 @@ class ImageProcessor:
         Initialize the image processor.
         
         Args:
-            temp_dir: Directory for temporary file storage
+            temp_dir: Directory for temporary file storage; it must already
+                exist, see config.ensure_directories()
         """
         self.temp_dir = temp_dir
-        self.temp_dir.mkdir(exist_ok=True, parents=True)
         logger.info(f"Initialized image processor with temp dir: {temp_dir}")
     
     @contextmanager
@@ -58,43 +84,46 @@ class ImageProcessor:
             Path to the temporary file
             
         Example:
-            with image_processor.temporary_file(".png") as temp_path:
+            with get_image_processor().temporary_file(".png") as temp_path:
                 image.save(temp_path)
                 # File is automatically cleaned up
         """
-        temp_file = None
         try:
             temp_file = tempfile.NamedTemporaryFile(
                 dir=self.temp_dir,
                 suffix=suffix,
                 delete=delete
             )
-            yield temp_file.name
         except Exception as e:
             logger.error(f"Error in temporary file context: {str(e)}")
             raise ImageProcessingError(f"Temporary file error: {str(e)}")
+        
+        try:
+            yield temp_file.name
         finally:
-            if temp_file and not delete:
-                try:
-                    temp_file.close()
-                except Exception as e:
-                    logger.warning(f"Error closing temporary file: {str(e)}")
+            try:
+                temp_file.close()
+            except Exception as e:
+                logger.warning(f"Error closing temporary file: {str(e)}")
     
-    def validate_file_content(self, file_content: bytes, filename: str) -> None:
+    def validate_file(self, file_path: Union[str, Path], filename: str) -> None:
         """
-        Validate uploaded file content for security and format compliance.
+        Validate a file on disk for security and format compliance.
         
         Args:
-            file_content: Raw file bytes
+            file_path: Path to the file contents
             filename: Original filename
             
         Raises:
             ImageProcessingError: If file is invalid or unsafe
         """
+        settings = get_settings()
+        
         # Check file size
-        if len(file_content) > settings.max_file_size:
+        file_size = Path(file_path).stat().st_size
+        if file_size > settings.max_file_size:
             raise ImageProcessingError(
-                f"File size {len(file_content)} bytes exceeds maximum allowed size "
+                f"File size {file_size} bytes exceeds maximum allowed size "
                 f"{settings.max_file_size} bytes"
             )
         
@@ -106,41 +135,37 @@ class ImageProcessor:
                 f"Supported extensions: {', '.join(ALLOWED_EXTENSIONS)}"
             )
         
-        # Basic content validation for image files
-        if file_ext in {".jpg", ".jpeg", ".png"}:
-            try:
-                # Try to load as image to validate format
-                image = Image.open(BytesIO(file_content))
-                image.verify()  # Verify it's a valid image
-                logger.debug(f"Validated image file: {filename} ({image.format}, {image.size})")
-            except Exception as e:
-                raise ImageProcessingError(f"Invalid image file: {str(e)}")
+        # Cheap magic-byte sniff; structural errors surface when the file is decoded
+        with open(file_path, 'rb') as f:
+            header = f.read(len(PNG_SIGNATURE))
+        
+        if file_ext in {".jpg", ".jpeg"}:
+            if not header.startswith(JPEG_SIGNATURE):
+                raise ImageProcessingError("Invalid image file: missing JPEG header")
+            logger.debug(f"Validated image file: {filename}")
+        
+        elif file_ext == ".png":
+            if not header.startswith(PNG_SIGNATURE):
+                raise ImageProcessingError("Invalid image file: missing PNG header")
+            logger.debug(f"Validated image file: {filename}")
         
-        # Basic content validation for PDF files
         elif file_ext == ".pdf":
-            # Check for PDF magic number
-            if not file_content.startswith(b'%PDF-'):
+            if not header.startswith(PDF_SIGNATURE):
                 raise ImageProcessingError("Invalid PDF file: missing PDF header")
             logger.debug(f"Validated PDF file: {filename}")
         
         logger.info(f"File validation passed for: {filename}")
     
-    def crop_and_save_prediction(
-        self, 
-        image: Image.Image, 
-        prediction: Dict[str, Any], 
-        output_path: Union[str, Path]
-    ) -> Image.Image:
+    def crop_prediction(self, image: Image.Image, prediction: Dict[str, Any]) -> Image.Image:
         """
-        Crop a detected label from an image and save it to disk.
+        Crop a detected label from an image.
         
         Args:
             image: Source PIL Image object
             prediction: Prediction dictionary with bounding box coordinates
-            output_path: Path where cropped image should be saved
             
         Returns:
-            Cropped PIL Image object
+            Cropped PIL Image object, rotated to portrait orientation
             
         Raises:
             ImageProcessingError: If cropping fails
@@ -169,117 +194,227 @@ class ImageProcessor:
             
             # Rotate to portrait orientation if needed (shipping labels are typically portrait)
             if cropped.width > cropped.height:
-                cropped = cropped.rotate(90, expand=True)
+                cropped = cropped.transpose(Image.Transpose.ROTATE_90)
                 logger.debug("Rotated cropped image to portrait orientation")
             
-            # Save the cropped image
-            cropped.save(output_path)
-            
-            logger.info(f"Cropped label saved to: {output_path}")
             logger.debug(f"Cropped dimensions: {cropped.width}x{cropped.height}")
-            
             return cropped
             
         except Exception as e:
             logger.error(f"Error cropping image: {str(e)}")
             raise ImageProcessingError(f"Failed to crop image: {str(e)}")
     
-    def convert_pdf_to_images(self, pdf_path: Union[str, Path], dpi: int = DEFAULT_DPI) -> list[Image.Image]:
+    def save_label(self, image: Image.Image, output_path: Union[str, Path]) -> None:
+        """
+        Save a cropped label as PNG for serving or printing.
+        
+        Args:
+            image: Cropped label image
+            output_path: Path where the PNG should be written
+            
+        Raises:
+            ImageProcessingError: If the image cannot be written
+        """
+        try:
+            # Fast PNG compression; API outputs are short-lived
+            image.save(output_path, format="PNG", compress_level=PNG_COMPRESS_LEVEL)
+            logger.info(f"Cropped label saved to: {output_path}")
+        except Exception as e:
+            logger.error(f"Error saving label: {str(e)}")
+            raise ImageProcessingError(f"Failed to save label: {str(e)}")
+    
+    def crop_and_save_prediction(
+        self, 
+        image: Image.Image, 
+        prediction: Dict[str, Any], 
+        output_path: Union[str, Path]
+    ) -> Image.Image:
+        """
+        Crop a detected label from an image and save it to disk.
+        
+        Args:
+            image: Source PIL Image object
+            prediction: Prediction dictionary with bounding box coordinates
+            output_path: Path where cropped image should be saved
+            
+        Returns:
+            Cropped PIL Image object
+            
+        Raises:
+            ImageProcessingError: If cropping or saving fails
+        """
+        cropped = self.crop_prediction(image, prediction)
+        self.save_label(cropped, output_path)
+        return cropped
+    
+    @staticmethod
+    def _pyvips_to_pil(page: "pyvips.Image") -> Image.Image:
+        """Convert a rendered pyvips page to an RGB PIL image."""
+        # Drop the alpha band; pdfload renders onto a white background
+        page = page[0:3]
+        return Image.frombuffer(
+            "RGB", (page.width, page.height), page.write_to_memory(), "raw", "RGB", 0, 1
+        )
+    
+    def count_pdf_pages(self, pdf_path: Union[str, Path]) -> int:
+        """
+        Count the pages in a PDF without rendering them.
+        
+        Args:
+            pdf_path: Path to the PDF file
+            
+        Returns:
+            Number of pages in the document
+            
+        Raises:
+            ImageProcessingError: If the PDF cannot be read
+        """
+        try:
+            if pyvips is not None:
+                # pdfload is lazy; reading the header doesn't rasterize the page
+                return pyvips.Image.pdfload(str(pdf_path), page=0).get("n-pages")
+            return int(pdfinfo_from_path(str(pdf_path))["Pages"])
+            
+        except Exception as e:
+            logger.error(f"Error reading PDF page count: {str(e)}")
+            raise ImageProcessingError(f"Failed to read PDF: {str(e)}")
+    
+    def render_pdf_page(
+        self, 
+        pdf_path: Union[str, Path], 
+        page_index: int, 
+        dpi: int = DEFAULT_DPI
+    ) -> Image.Image:
         """
-        Convert PDF pages to PIL Image objects.
+        Render a single PDF page to a PIL Image object.
         
         Args:
             pdf_path: Path to the PDF file
+            page_index: Zero-based page number
             dpi: Resolution for conversion
             
         Returns:
-            List of PIL Image objects, one per page
+            PIL Image of the requested page
             
         Raises:
             ImageProcessingError: If PDF conversion fails
         """
         try:
-            pages = convert_from_path(pdf_path, dpi=dpi)
-            logger.info(f"Converted PDF to {len(pages)} image(s) at {dpi} DPI")
-            return pages
+            if pyvips is not None:
+                return self._pyvips_to_pil(
+                    pyvips.Image.pdfload(str(pdf_path), page=page_index, dpi=dpi)
+                )
+            return convert_from_path(
+                pdf_path, dpi=dpi, first_page=page_index + 1, last_page=page_index + 1
+            )[0]
             
         except Exception as e:
-            logger.error(f"Error converting PDF: {str(e)}")
-            raise ImageProcessingError(f"Failed to convert PDF: {str(e)}")
+            logger.error(f"Error rendering PDF page {page_index}: {str(e)}")
+            raise ImageProcessingError(f"Failed to render PDF page: {str(e)}")
+    
+    @staticmethod
+    def _scale_prediction(prediction: Dict[str, Any], factor: float) -> Dict[str, Any]:
+        """Scale a prediction's bounding box to a different image resolution."""
+        scaled = dict(prediction)
+        for key in ("x", "y", "width", "height"):
+            scaled[key] = prediction[key] * factor
+        return scaled
     
-    def process_uploaded_file(
+    def process_file(
         self, 
-        file_content: bytes, 
+        file_path: Union[str, Path], 
         filename: str
-    ) -> tuple[Optional[Image.Image], str, Optional[Dict[str, Any]]]:
+    ) -> tuple[Optional[Image.Image], Optional[str], Optional[Dict[str, Any]]]:
         """
-        Process an uploaded file and extract the best shipping label.
+        Process a file on disk and extract the best shipping label.
         
         This method handles both PDF and image files, validates content,
         runs inference, and returns the cropped label.
         
         Args:
-            file_content: Raw file bytes
-            filename: Original filename
+            file_path: Path to the file contents
+            filename: Original filename, used to determine the file type
             
         Returns:
-            Tuple of (cropped_image, temp_file_path, best_prediction)
-            Returns (None, error_message, None) if processing fails
+            Tuple of (cropped_image, None, best_prediction); the crop is kept
+            in memory and callers decide where (and whether) to save it.
+            Returns (None, error_message, None) if no label is detected
             
         Raises:
             ImageProcessingError: If file processing fails
         """
-        from services.inference import inference_service
-        
         try:
             # Validate file content first
-            self.validate_file_content(file_content, filename)
+            self.validate_file(file_path, filename)
             
-            # Create temporary file for processing
-            with self.temporary_file(suffix=Path(filename).suffix) as temp_input_path:
-                # Write content to temporary file
-                with open(temp_input_path, 'wb') as f:
-                    f.write(file_content)
+            # Process based on file type
+            if filename.lower().endswith(".pdf"):
+                return self._process_pdf_file(str(file_path), filename)
+            else:
+                return self._process_image_file(str(file_path), filename)
                 
-                # Process based on file type
-                if filename.lower().endswith(".pdf"):
-                    return self._process_pdf_file(temp_input_path, filename)
-                else:
-                    return self._process_image_file(temp_input_path, filename)
-                    
         except ImageProcessingError:
             raise
         except Exception as e:
-            logger.error(f"Error processing uploaded file {filename}: {str(e)}")
+            logger.error(f"Error processing file {filename}: {str(e)}")
             raise ImageProcessingError(f"File processing failed: {str(e)}")
     
+    def _detect_pdf_page(self, pdf_path: str, page_index: int) -> Optional[Dict[str, Any]]:
+        """
+        Render one PDF page at DETECT_DPI and run label detection on it.
+        
+        Returns:
+            Best prediction in DETECT_DPI coordinates, or None if the page has no label
+        """
+        from services.inference import get_inference_service
+        
+        inference_service = get_inference_service()
+        
+        page = self.render_pdf_page(pdf_path, page_index, dpi=DETECT_DPI)
+        try:
+            predictions, best_pred = inference_service.detect_labels(page)
+            return best_pred
+        except ValueError as e:
+            logger.debug(f"No labels detected on page {page_index}: {str(e)}")
+            return None
+    
     def _process_pdf_file(
         self, 
         pdf_path: str, 
         filename: str
-    ) -> tuple[Optional[Image.Image], str, Optional[Dict[str, Any]]]:
+    ) -> tuple[Optional[Image.Image], Optional[str], Optional[Dict[str, Any]]]:
         """Process a PDF file and extract labels from pages."""
-        from services.inference import inference_service
-        
         try:
-            pages = self.convert_pdf_to_images(pdf_path)
+            n_pages = self.count_pdf_pages(pdf_path)
             
-            for i, page in enumerate(pages):
-                try:
-                    # Run inference on this page
-                    predictions, best_pred = inference_service.detect_labels(page)
+            # Each page is rendered (at DETECT_DPI, detection doesn't need print
+            # resolution) and inferred as one task, a few pages at a time, so the
+            # HTTP round-trips overlap. Results are read in page order, and pages
+            # still queued are cancelled once a label is found
+            executor = ThreadPoolExecutor(
+                max_workers=max(1, min(PDF_MAX_WORKERS, n_pages)),
+                thread_name_prefix="pdf-page"
+            )
+            try:
+                futures = [
+                    executor.submit(self._detect_pdf_page, pdf_path, i)
+                    for i in range(n_pages)
+                ]
+                for i, future in enumerate(futures):
+                    best_pred = future.result()
+                    if best_pred is None:
+                        continue
                     
-                    # Create temporary output file (not auto-deleted for return)
-                    with self.temporary_file(".png", delete=False) as temp_output_path:
-                        cropped = self.crop_and_save_prediction(page, best_pred, temp_output_path)
-                        
-                        logger.info(f"Successfully processed page {i} of PDF: {filename}")
-                        return cropped, temp_output_path, best_pred
-                        
-                except ValueError as e:
-                    # No labels detected on this page, try next page
-                    logger.debug(f"No labels detected on page {i} of {filename}: {str(e)}")
-                    continue
+                    # Re-render only the matching page at full resolution for the crop
+                    full_page = self.render_pdf_page(pdf_path, i, dpi=DEFAULT_DPI)
+                    best_pred = self._scale_prediction(best_pred, DEFAULT_DPI / DETECT_DPI)
+                    cropped = self.crop_prediction(full_page, best_pred)
+                    
+                    logger.info(f"Successfully processed page {i} of PDF: {filename}")
+                    return cropped, None, best_pred
+            finally:
+                # Don't wait on requests for pages after the one that matched
+                executor.shutdown(wait=False, cancel_futures=True)
             
             # No labels found in any page
             return None, "No shipping labels detected in PDF", None
@@ -288,27 +423,47 @@ class ImageProcessor:
             logger.error(f"Error processing PDF file: {str(e)}")
             raise ImageProcessingError(f"PDF processing failed: {str(e)}")
     
+    @staticmethod
+    def _load_image(image: Image.Image) -> Image.Image:
+        """Decode an opened image file as RGB."""
+        # convert() always copies, so skip it when the image is already RGB
+        image.load()
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        return image
+    
+    def _open_image(self, image_path: str, filename: str) -> Image.Image:
+        """Validate an image file and open it, reading only its header."""
+        self.validate_file(image_path, filename)
+        return Image.open(image_path)
+    
     def _process_image_file(
         self, 
         image_path: str, 
         filename: str
-    ) -> tuple[Optional[Image.Image], str, Optional[Dict[str, Any]]]:
+    ) -> tuple[Optional[Image.Image], Optional[str], Optional[Dict[str, Any]]]:
         """Process an image file and extract labels."""
-        from services.inference import inference_service
+        from services.inference import get_inference_service
+        
+        inference_service = get_inference_service()
         
         try:
-            # Load and convert image to RGB
-            image = Image.open(image_path).convert("RGB")
+            image = Image.open(image_path)  # Reads the header only
             
-            # Run inference
-            predictions, best_pred = inference_service.detect_labels(image)
+            # Files that can be sent as-is are inferred from their path and
+            # only decoded here, for the crop; anything else is decoded once
+            # and the decoded image is what gets encoded for inference
+            if inference_service.can_send_raw(image):
+                predictions, best_pred = inference_service.detect_labels(image_path)
+                image = self._load_image(image)
+            else:
+                image = self._load_image(image)
+                predictions, best_pred = inference_service.detect_labels(image)
             
-            # Create temporary output file (not auto-deleted for return)
-            with self.temporary_file(".png", delete=False) as temp_output_path:
-                cropped = self.crop_and_save_prediction(image, best_pred, temp_output_path)
-                
-                logger.info(f"Successfully processed image: {filename}")
-                return cropped, temp_output_path, best_pred
+            cropped = self.crop_prediction(image, best_pred)
+            
+            logger.info(f"Successfully processed image: {filename}")
+            return cropped, None, best_pred
                 
         except ValueError as e:
             # No labels detected
@@ -316,7 +471,80 @@ class ImageProcessor:
         except Exception as e:
             logger.error(f"Error processing image file: {str(e)}")
             raise ImageProcessingError(f"Image processing failed: {str(e)}")
+    
+    async def process_image_file_async(
+        self, 
+        image_path: Union[str, Path], 
+        filename: str
+    ) -> tuple[Optional[Image.Image], Optional[str], Optional[Dict[str, Any]]]:
+        """
+        Async counterpart of process_file() for image (non-PDF) files.
+        
+        Validation, decoding and cropping run on the shared bounded thread pool
+        while the inference request is awaited on the event loop. When the
+        file's bytes are sent as-is, decoding overlaps the request.
+        
+        Args:
+            image_path: Path to the image file
+            filename: Original filename
+            
+        Returns:
+            Same as process_file()
+            
+        Raises:
+            ImageProcessingError: If file processing fails
+        """
+        from services.inference import get_inference_service
+        
+        inference_service = get_inference_service()
+        
+        try:
+            image = await run_blocking(self._open_image, str(image_path), filename)
+            
+            # The file's bytes are sent for inference as-is, or with
+            # DECODE_PROCESSES set re-encoded in a decode process, so decode
+            # the image for cropping here while the request is in flight
+            if inference_service.can_send_raw(image) or get_settings().decode_processes:
+                decode_task = asyncio.ensure_future(run_blocking(self._load_image, image))
+                try:
+                    predictions, best_pred = await inference_service.detect_labels_async(image_path)
+                except BaseException:
+                    _discard_task(decode_task)
+                    raise
+                image = await decode_task
+            else:
+                # The decoded image is encoded for inference, so decode it first
+                image = await run_blocking(self._load_image, image)
+                predictions, best_pred = await inference_service.detect_labels_async(image)
+            
+            cropped = await run_blocking(self.crop_prediction, image, best_pred)
+            
+            logger.info(f"Successfully processed image: {filename}")
+            return cropped, None, best_pred
+            
+        except ValueError as e:
+            # No labels detected
+            return None, f"No shipping labels detected in image: {str(e)}", None
+        except ImageProcessingError:
+            raise
+        except Exception as e:
+            logger.error(f"Error processing image file: {str(e)}")
+            raise ImageProcessingError(f"Image processing failed: {str(e)}")
+
+
+@lru_cache(maxsize=1)
+def get_image_processor() -> ImageProcessor:
+    """
+    Get the shared image processor, creating it on first use.
+    
+    Returns:
+        Cached ImageProcessor instance
+    """
+    return ImageProcessor()
 
 
-# Global image processor instance
-image_processor = ImageProcessor()
\ No newline at end of file
+def __getattr__(name: str):
+    """Keep `from services.image_processing import image_processor` working, lazily."""
+    if name == "image_processor":
+        return get_image_processor()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
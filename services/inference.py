@@ -5,18 +5,243 @@ This module handles all interactions with the Roboflow inference API,
 providing a clean interface for label detection functionality.
 """
 
+import asyncio
+import base64
+import hashlib
+import json
 import logging
-from typing import Dict, Any, Union, List
+import os
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+from typing import Dict, Any, Union, List, Optional
 from pathlib import Path
 
+import httpx
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from PIL import Image
-from inference_sdk import InferenceHTTPClient, InferenceConfiguration
 
-from config import settings, TARGET_RATIOS
+from config import (
+    get_settings, TARGET_RATIOS, INFER_JPEG_QUALITY, PDF_MAX_WORKERS, WARMUP_TIMEOUT
+)
+from services.executor import run_blocking
 
 
 logger = logging.getLogger(__name__)
 
+ROBOFLOW_API_URL = "https://serverless.roboflow.com"
+EXIF_ORIENTATION = 0x0112
+
+# Transient API failures are retried with exponential backoff, on both the
+# sync session and the async client
+RETRY_ATTEMPTS = 2
+RETRY_BACKOFF = 0.1  # Seconds before the first retry, doubling after that
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+# Sorted so the nearest target ratio can be found by binary search
+_TARGETS_SORTED = np.sort(np.asarray(TARGET_RATIOS, dtype=np.float64))
+
+# Column layout used when scoring predictions; the row index is the position
+# in the original predictions list
+_BOX_DTYPE = np.dtype([("width", np.float64), ("height", np.float64)])
+
+
+class InferenceError(Exception):
+    """Custom exception for inference API errors."""
+    pass
+
+
+class NoLabelsError(ValueError):
+    """Raised when an image has no detectable shipping label, including images too small to hold one."""
+    pass
+
+
+class InferenceCache:
+    """
+    Disk-backed cache of inference results keyed by image content.
+    
+    Each entry is a small JSON file named by a BLAKE2b digest of the request
+    payload and model settings, so identical images skip the API round-trip,
+    including across restarts and worker processes. Once max_entries is
+    exceeded by more than a 10% margin, the least recently used entries are
+    removed. The margin means the directory is rescanned once per batch of
+    puts rather than on every put.
+    
+    The cache directory must already exist; see config.ensure_directories().
+    """
+    
+    def __init__(self, cache_dir: Path, max_entries: int):
+        """
+        Initialize the inference cache.
+        
+        Args:
+            cache_dir: Directory holding the cached results
+            max_entries: Maximum number of cached results to keep
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self._prune_margin = max(1, max_entries // 10)
+        # Entries counted since the last directory scan. It starts unknown
+        # and is reset by each scan, which also picks up entries written by
+        # other processes
+        self._entry_count: Optional[int] = None
+        self._prune_lock = threading.Lock()
+    
+    @staticmethod
+    def make_key(payload: bytes, *parts: str) -> str:
+        """Build a cache key from the request payload and the parameters that affect its result."""
+        hasher = hashlib.blake2b(payload, digest_size=16)
+        for part in parts:
+            hasher.update(b"\0" + part.encode("utf-8"))
+        return hasher.hexdigest()
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached results for a key, or None on a miss."""
+        path = self.cache_dir / f"{key}.json"
+        try:
+            with open(path, "rb") as f:
+                results = json.load(f)
+            os.utime(path)  # Mark as recently used
+            return results
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read cached inference result {path}: {str(e)}")
+            return None
+    
+    def put(self, key: str, results: Dict[str, Any]) -> None:
+        """Store results for a key; failures are logged and otherwise ignored."""
+        path = self.cache_dir / f"{key}.json"
+        temp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(results, f)
+            os.replace(temp_path, path)  # Atomic, readers never see a partial file
+            
+            with self._prune_lock:
+                if self._entry_count is not None:
+                    # Overwriting an existing key over-counts until the next scan
+                    self._entry_count += 1
+                    if self._entry_count <= self.max_entries + self._prune_margin:
+                        return
+                self._entry_count = self._prune()
+        except OSError as e:
+            logger.warning(f"Could not cache inference result: {str(e)}")
+    
+    def _prune(self) -> int:
+        """
+        Remove the least recently used entries beyond max_entries.
+        
+        Returns:
+            Number of entries left in the cache
+        """
+        entries = [entry for entry in os.scandir(self.cache_dir) if entry.name.endswith(".json")]
+        excess = len(entries) - self.max_entries
+        if excess <= 0:
+            return len(entries)
+        
+        def last_used(entry: os.DirEntry) -> float:
+            try:
+                return entry.stat().st_mtime
+            except OSError:
+                return 0.0
+        
+        for entry in sorted(entries, key=last_used)[:excess]:
+            try:
+                os.unlink(entry.path)
+            except OSError:
+                pass
+        return self.max_entries
+
+
+class RequestLimiter:
+    """
+    Limit on in-flight requests shared by threads and event loop tasks.
+    
+    The sync path (PDF page threads) and the async path (image uploads) draw
+    from one budget. Threads block on an event, while tasks await a future.
+    Neither holds a thread of the shared pool while it waits, so queued
+    inferences can't starve other blocking work. Slots are handed to waiters
+    in arrival order.
+    """
+    
+    def __init__(self, limit: int):
+        """
+        Args:
+            limit: Maximum number of requests in flight at once
+        """
+        self._lock = threading.Lock()
+        self._available = limit
+        self._waiters: deque = deque()
+    
+    def acquire(self) -> None:
+        """Take a slot, blocking the calling thread until one is free."""
+        with self._lock:
+            if self._available and not self._waiters:
+                self._available -= 1
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+        event.wait()  # The slot is handed over by release()
+    
+    async def acquire_async(self) -> None:
+        """Take a slot, waiting on the event loop until one is free."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._available and not self._waiters:
+                self._available -= 1
+                return
+            waiter = loop.create_future()
+            self._waiters.append((loop, waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            with self._lock:
+                try:
+                    self._waiters.remove((loop, waiter))
+                    handed_over = False
+                except ValueError:
+                    handed_over = True
+            if handed_over:
+                # release() picked this waiter before the cancellation landed
+                self.release()
+            raise
+    
+    def release(self) -> None:
+        """Return a slot, handing it straight to the longest waiting caller if any."""
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if isinstance(waiter, threading.Event):
+                    waiter.set()
+                    return
+                loop, future = waiter
+                try:
+                    loop.call_soon_threadsafe(_wake, future)
+                    return
+                except RuntimeError:
+                    continue  # Its event loop has closed; try the next waiter
+            self._available += 1
+    
+    def __enter__(self) -> "RequestLimiter":
+        self.acquire()
+        return self
+    
+    def __exit__(self, *exc_info: Any) -> None:
+        self.release()
+
+
+def _wake(future: "asyncio.Future") -> None:
+    """Resolve a slot waiter unless it was cancelled in the meantime."""
+    if not future.done():
+        future.set_result(None)
+
 
 class InferenceService:
     """
@@ -26,7 +251,16 @@ class InferenceService:
     providing secure API key handling and consistent error management.
     """
     
-    def __init__(self, api_key: str, model_id: str, confidence_threshold: float = 0.04):
+    def __init__(
+        self,
+        api_key: str,
+        model_id: str,
+        confidence_threshold: float = 0.04,
+        api_url: str = ROBOFLOW_API_URL,
+        cache: Optional[InferenceCache] = None,
+        reuse_session: bool = True,
+        batch_workers: int = 1
+    ):
         """
         Initialize the inference service.
         
@@ -34,24 +268,382 @@ class InferenceService:
             api_key: Roboflow API key for authentication
             model_id: Model identifier for inference
             confidence_threshold: Minimum confidence for predictions
+            api_url: Base URL of the Roboflow inference API
+            cache: Optional cache of results for previously seen images
+            reuse_session: Keep one pooled keep-alive session for all calls;
+                disable to open a fresh connection per request
+            batch_workers: Threads used by detect_labels_batch(); 1 runs
+                batches serially without a pool
         """
+        settings = get_settings()
         self.api_key = api_key
         self.model_id = model_id
         self.confidence_threshold = confidence_threshold
+        self.cache = cache
         
-        # Configure inference settings
-        self.config = InferenceConfiguration(
-            confidence_threshold=confidence_threshold
-        )
+        # Created on first async use so it binds to the running event loop
+        self._async_client: Optional[httpx.AsyncClient] = None
         
-        # Initialize client with secure API key handling
-        self.client = InferenceHTTPClient(
-            api_url="https://serverless.roboflow.com/",
-            api_key=api_key
-        )
+        # Cap requests in flight so bursts queue locally instead of triggering
+        # 429s. One limiter covers both the sync path (PDF page threads) and
+        # the async path, so together they never exceed the limit
+        self._request_slots = RequestLimiter(settings.max_concurrent_inferences)
+        
+        self._decode_pool: Optional[ProcessPoolExecutor] = None
+        # Its own pool rather than the shared one: batches may be submitted
+        # from shared pool threads, which would otherwise wait on themselves
+        self.batch_workers = batch_workers
+        self._batch_pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self.api_url = api_url.rstrip("/")
+        self.infer_url = f"{self.api_url}/{model_id}"
+        
+        # Long-lived session so inference calls reuse pooled keep-alive
+        # connections instead of paying a TCP + TLS handshake every time.
+        # The pool covers every processing thread fanning out over PDF pages
+        self.session: Optional[requests.Session] = None
+        if reuse_session:
+            self.session = requests.Session()
+            self.session.mount(
+                "https://",
+                HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=settings.max_workers * PDF_MAX_WORKERS,
+                    max_retries=Retry(
+                        total=RETRY_ATTEMPTS,
+                        backoff_factor=RETRY_BACKOFF,
+                        status_forcelist=RETRY_STATUSES,
+                        allowed_methods=frozenset({"HEAD", "POST"}),  # Inference is idempotent
+                        raise_on_status=False
+                    )
+                )
+            )
         
         logger.info(f"Initialized inference service with model {model_id}")
     
+    def warmup(self, timeout: float = WARMUP_TIMEOUT) -> None:
+        """
+        Open a pooled connection for the sync session ahead of the first request.
+        
+        Failures are logged and otherwise ignored; the first inference will
+        simply connect on demand.
+        
+        Args:
+            timeout: Seconds to wait for the API to answer
+        """
+        if self.session is None:
+            return
+        try:
+            self.session.head(self.api_url, timeout=timeout)
+            logger.info("Inference API connection warmed up")
+        except requests.RequestException as e:
+            logger.warning(f"Could not warm up inference API connection: {self._redact(e)}")
+    
+    async def warmup_async(self) -> None:
+        """
+        Warm the async client used for image uploads and the sync session used for PDF pages.
+        
+        Both connect concurrently. The caller waits at most WARMUP_TIMEOUT
+        seconds, so an unreachable API doesn't hold up server startup; in that
+        case the first request connects on demand.
+        """
+        async def warm_async_client() -> None:
+            try:
+                await self._get_async_client().head(self.api_url, timeout=WARMUP_TIMEOUT)
+                logger.info("Async inference API connection warmed up")
+            except httpx.HTTPError as e:
+                logger.warning(f"Could not warm up async inference API connection: {self._redact(e)}")
+        
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(run_blocking(self.warmup), warm_async_client()),
+                timeout=WARMUP_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Inference API warmup timed out after {WARMUP_TIMEOUT}s")
+    
+    def _redact(self, error: Exception) -> str:
+        """Format an error without leaking the API key embedded in request URLs."""
+        message = str(error)
+        if self.api_key:
+            message = message.replace(self.api_key, "***")
+        return message
+    
+    @staticmethod
+    def _encode_image(image: Image.Image) -> bytes:
+        """Encode an image as base64 JPEG, the payload format the Roboflow API accepts."""
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        buffer = BytesIO()
+        image.save(buffer, format="JPEG", quality=INFER_JPEG_QUALITY)
+        return base64.b64encode(buffer.getvalue())
+    
+    @staticmethod
+    def _downscale(image: Image.Image) -> tuple[Image.Image, float]:
+        """
+        Shrink an image so its longest edge fits settings.max_infer_edge.
+        
+        The detector runs at a far lower resolution than a full page or photo,
+        so the extra pixels only cost upload bandwidth.
+        
+        Returns:
+            Tuple of (image, scale) where scale is new size / original size
+        """
+        settings = get_settings()
+        longest = max(image.size)
+        if not settings.max_infer_edge or longest <= settings.max_infer_edge:
+            return image, 1.0
+        
+        scale = settings.max_infer_edge / longest
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        # For JPEG files, let the decoder skip detail we're about to discard
+        image.draft("RGB", size)
+        return image.resize(size, Image.Resampling.BILINEAR), scale
+    
+    @staticmethod
+    def _rescale_results(results: Dict[str, Any], scale: float) -> Dict[str, Any]:
+        """Map prediction boxes from a downscaled payload back to original image coordinates."""
+        if scale == 1.0:
+            return results
+        factor = 1 / scale
+        predictions = [
+            {
+                **pred,
+                "x": pred["x"] * factor,
+                "y": pred["y"] * factor,
+                "width": pred["width"] * factor,
+                "height": pred["height"] * factor
+            }
+            for pred in results.get("predictions", [])
+        ]
+        return {**results, "predictions": predictions}
+    
+    def _post_image(self, payload: bytes) -> Dict[str, Any]:
+        """
+        Send a base64 encoded image to the inference API.
+        
+        Args:
+            payload: Base64 encoded image bytes
+            
+        Returns:
+            Parsed JSON inference results
+            
+        Raises:
+            InferenceError: If the request fails or returns an error status
+        """
+        # Without a shared session, requests.post() opens a one-off connection
+        http = self.session if self.session is not None else requests
+        try:
+            with self._request_slots:
+                response = http.post(
+                    self.infer_url,
+                    params={"api_key": self.api_key, "confidence": self.confidence_threshold},
+                    data=payload,
+                    headers={"Content-Type": "application/x-www-form-urlencoded"},
+                    timeout=get_settings().api_timeout
+                )
+            response.raise_for_status()
+            return response.json()
+        except requests.RequestException as e:
+            raise InferenceError(f"Inference request failed: {self._redact(e)}") from None
+    
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """Create the shared httpx client on first use, bound to the running event loop."""
+        if self._async_client is None:
+            settings = get_settings()
+            self._async_client = httpx.AsyncClient(
+                timeout=settings.api_timeout,
+                limits=httpx.Limits(
+                    max_keepalive_connections=settings.max_workers * PDF_MAX_WORKERS
+                ),
+                transport=httpx.AsyncHTTPTransport(retries=2)
+            )
+        return self._async_client
+    
+    async def _post_image_async(self, payload: bytes) -> Dict[str, Any]:
+        """
+        Async counterpart of _post_image() using the shared httpx client.
+        
+        httpx only retries failed connections itself, so throttling (429) and
+        gateway errors are retried here, like the sync session's Retry policy.
+        A Retry-After header is honoured, and the request slot is released
+        while waiting.
+        
+        Raises:
+            InferenceError: If the request fails or returns an error status
+        """
+        client = self._get_async_client()
+        try:
+            for attempt in range(RETRY_ATTEMPTS + 1):
+                await self._request_slots.acquire_async()
+                try:
+                    response = await client.post(
+                        self.infer_url,
+                        params={"api_key": self.api_key, "confidence": self.confidence_threshold},
+                        content=payload,
+                        headers={"Content-Type": "application/x-www-form-urlencoded"}
+                    )
+                finally:
+                    self._request_slots.release()
+                if response.status_code not in RETRY_STATUSES or attempt == RETRY_ATTEMPTS:
+                    break
+                delay = self._retry_delay(response, attempt)
+                logger.warning(
+                    f"Inference API returned {response.status_code}, retrying in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPError as e:
+            raise InferenceError(f"Inference request failed: {self._redact(e)}") from None
+    
+    @staticmethod
+    def _retry_delay(response: httpx.Response, attempt: int) -> float:
+        """Seconds to wait before retrying: the server's Retry-After if given, else backoff."""
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return min(float(retry_after), get_settings().api_timeout)
+        return RETRY_BACKOFF * 2 ** attempt
+    
+    async def aclose(self) -> None:
+        """Close both HTTP clients, the decode processes and the batch pool, if they were started."""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+        if self.session is not None:
+            self.session.close()
+        if self._decode_pool is not None:
+            self._decode_pool.shutdown(wait=False, cancel_futures=True)
+            self._decode_pool = None
+        if self._batch_pool is not None:
+            self._batch_pool.shutdown(wait=False, cancel_futures=True)
+            self._batch_pool = None
+    
+    async def _prepare_payload_async(
+        self, 
+        image_input: Union[str, Path, Image.Image]
+    ) -> tuple[bytes, float]:
+        """
+        Run _prepare_payload() off the event loop.
+        
+        Image files are handed to the decode process pool when
+        settings.decode_processes is set, so concurrent decodes and JPEG
+        encodes aren't serialized on the GIL; everything else runs on the
+        shared thread pool.
+        """
+        settings = get_settings()
+        if not settings.decode_processes or not isinstance(image_input, (str, Path)):
+            return await run_blocking(self._prepare_payload, image_input)
+        
+        with self._pool_lock:
+            if self._decode_pool is None:
+                # spawn, not fork: the server process is already multi-threaded
+                self._decode_pool = ProcessPoolExecutor(
+                    max_workers=settings.decode_processes,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+        return await asyncio.get_running_loop().run_in_executor(
+            self._decode_pool, InferenceService._prepare_payload, str(image_input)
+        )
+    
+    @staticmethod
+    def can_send_raw(image: Image.Image) -> bool:
+        """
+        Check whether an opened image file can be sent for inference as-is.
+        
+        Only JPEG and PNG files without an EXIF rotation that already fit
+        settings.max_infer_edge qualify, so the coordinates the API returns
+        match the pixels PIL decodes locally. Only header fields are read, so
+        the check doesn't decode the image.
+        
+        Args:
+            image: Image opened from a file, typically not yet loaded
+            
+        Returns:
+            True if the file's bytes can be used as the request payload
+        """
+        if image.format not in ("JPEG", "PNG"):
+            return False
+        # PngImageFile.getexif() decodes the whole image looking for an eXIf
+        # chunk after the pixel data; only trust EXIF found in the header
+        if image.format == "JPEG" or "exif" in image.info:
+            if image.getexif().get(EXIF_ORIENTATION, 1) != 1:
+                return False
+        max_edge = get_settings().max_infer_edge
+        return not max_edge or max(image.size) <= max_edge
+    
+    @staticmethod
+    def _check_min_size(size: tuple[int, int]) -> None:
+        """
+        Reject images too small to contain a readable label before inference.
+        
+        Args:
+            size: Image (width, height), as already read from the header or image
+        
+        Raises:
+            NoLabelsError: If the image has fewer than settings.min_infer_pixels pixels
+        """
+        width, height = size
+        if width * height < get_settings().min_infer_pixels:
+            raise NoLabelsError(f"Image too small for inference ({width}x{height})")
+    
+    @staticmethod
+    def _prepare_payload(image_input: Union[str, Path, Image.Image]) -> tuple[bytes, float]:
+        """
+        Load an image input and encode it as a request payload.
+        
+        Files that pass can_send_raw() are sent as their own bytes; anything
+        else is decoded (once, from the same open file) and re-encoded.
+        A static method so it can run in the decode process pool.
+        
+        Returns:
+            Tuple of (payload, scale) where scale is the payload image size
+            relative to the input; see _downscale()
+        
+        Raises:
+            ValueError: If image_input type is not supported, or the image is
+                too small to hold a label (see _check_min_size())
+        """
+        # Handle different input types
+        if isinstance(image_input, (str, Path)):
+            with Image.open(image_input) as image:  # Reads the header only
+                InferenceService._check_min_size(image.size)
+                if InferenceService.can_send_raw(image):
+                    # Send the file as-is instead of decoding and re-encoding it
+                    logger.debug(f"Using raw file bytes from path: {image_input}")
+                    with open(image_input, "rb") as f:
+                        return base64.b64encode(f.read()), 1.0
+                
+                logger.debug(f"Loaded image from path: {image_input}")
+                image, scale = InferenceService._downscale(image)
+                return InferenceService._encode_image(image), scale
+        elif isinstance(image_input, Image.Image):
+            # Use PIL Image directly
+            logger.debug("Using provided PIL Image object")
+            InferenceService._check_min_size(image_input.size)
+            image, scale = InferenceService._downscale(image_input)
+            return InferenceService._encode_image(image), scale
+        else:
+            raise ValueError(f"Unsupported image input type: {type(image_input)}")
+    
+    def _cache_lookup(self, payload: bytes) -> tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """
+        Look up cached results for a payload.
+        
+        Identical images (e.g. re-uploaded labels) are answered from the cache.
+        
+        Returns:
+            Tuple of (cache_key, cached_results); both None when caching is disabled
+        """
+        if self.cache is None:
+            return None, None
+        
+        cache_key = self.cache.make_key(payload, self.model_id, str(self.confidence_threshold))
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Inference cache hit: {len(cached.get('predictions', []))} predictions")
+        return cache_key, cached
+    
     def infer_image(self, image_input: Union[str, Path, Image.Image]) -> Dict[str, Any]:
         """
         Run inference on an image to detect shipping labels.
@@ -66,35 +658,86 @@ class InferenceService:
             Dictionary containing inference results with predictions
             
         Raises:
-            ValueError: If image_input type is not supported
-            Exception: If inference fails
+            ValueError: If image_input type is not supported or the image is
+                too small to hold a label
+            InferenceError: If the inference request fails
         """
         try:
-            # Handle different input types
-            if isinstance(image_input, (str, Path)):
-                # Load image from file path
-                image = Image.open(image_input)
-                logger.debug(f"Loaded image from path: {image_input}")
-            elif isinstance(image_input, Image.Image):
-                # Use PIL Image directly
-                image = image_input
-                logger.debug("Using provided PIL Image object")
-            else:
-                raise ValueError(f"Unsupported image input type: {type(image_input)}")
+            payload, scale = self._prepare_payload(image_input)
             
-            # Run inference with configured settings
-            with self.client.use_configuration(self.config):
-                results = self.client.infer(image, model_id=self.model_id)
+            cache_key, results = self._cache_lookup(payload)
+            if results is None:
+                # Run inference over the pooled session
+                results = self._post_image(payload)
+                
+                prediction_count = len(results.get("predictions", []))
+                logger.info(f"Inference completed: {prediction_count} predictions found")
+                
+                if cache_key is not None:
+                    self.cache.put(cache_key, results)
             
-            prediction_count = len(results.get("predictions", []))
-            logger.info(f"Inference completed: {prediction_count} predictions found")
+            return self._rescale_results(results, scale)
             
-            return results
+        except ValueError:
+            raise  # Unusable input (wrong type or too small), not an API failure
+        except Exception as e:
+            logger.error(f"Inference failed: {str(e)}")
+            raise
+    
+    async def infer_image_async(self, image_input: Union[str, Path, Image.Image]) -> Dict[str, Any]:
+        """
+        Run inference on an image without blocking the event loop.
+        
+        Image encoding and cache file access run on the shared thread pool; the API
+        request itself is awaited, so concurrent callers don't each hold a
+        thread for the round-trip.
+        
+        Args:
+            image_input: Either a file path (str/Path) or PIL Image object
             
+        Returns:
+            Dictionary containing inference results with predictions
+            
+        Raises:
+            ValueError: If image_input type is not supported or the image is
+                too small to hold a label
+            InferenceError: If the inference request fails
+        """
+        try:
+            payload, scale = await self._prepare_payload_async(image_input)
+            
+            cache_key, results = await run_blocking(self._cache_lookup, payload)
+            if results is None:
+                results = await self._post_image_async(payload)
+                
+                prediction_count = len(results.get("predictions", []))
+                logger.info(f"Inference completed: {prediction_count} predictions found")
+                
+                if cache_key is not None:
+                    await run_blocking(self.cache.put, cache_key, results)
+            
+            return self._rescale_results(results, scale)
+            
+        except ValueError:
+            raise  # Unusable input (wrong type or too small), not an API failure
         except Exception as e:
             logger.error(f"Inference failed: {str(e)}")
             raise
     
+    @staticmethod
+    def _box_array(predictions: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Gather prediction box sizes into a structured array in a single pass.
+        
+        Scoring then works on contiguous width/height columns instead of
+        looking up dict keys per prediction per field.
+        """
+        return np.fromiter(
+            ((pred["width"], pred["height"]) for pred in predictions),
+            dtype=_BOX_DTYPE,
+            count=len(predictions)
+        )
+    
     def pick_best_prediction(self, predictions: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         Select the best shipping label prediction based on aspect ratio.
@@ -114,18 +757,24 @@ class InferenceService:
         if not predictions:
             raise ValueError("No predictions provided")
         
-        def aspect_ratio_score(pred: Dict[str, Any]) -> float:
-            """Calculate aspect ratio score for a prediction."""
-            width, height = pred["width"], pred["height"]
-            if height == 0:
-                return float('inf')  # Avoid division by zero
-            
-            ratio = width / height
-            # Find minimum distance to target ratios
-            return min(abs(ratio - target) for target in TARGET_RATIOS)
+        # Score every prediction in one vectorized pass: distance from its
+        # aspect ratio to the nearest target ratio
+        boxes = self._box_array(predictions)
+        widths, heights = boxes["width"], boxes["height"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratios = widths / heights
+        # The nearest target is one of the two neighbours of each ratio's
+        # insertion point, so scoring is O(log T) per prediction
+        last = len(_TARGETS_SORTED) - 1
+        index = np.searchsorted(_TARGETS_SORTED, ratios)
+        below = _TARGETS_SORTED[np.clip(index - 1, 0, last)]
+        above = _TARGETS_SORTED[np.clip(index, 0, last)]
+        scores = np.minimum(np.abs(ratios - below), np.abs(ratios - above))
+        scores[heights == 0] = np.inf  # Avoid division by zero
         
-        best_prediction = min(predictions, key=aspect_ratio_score)
-        best_score = aspect_ratio_score(best_prediction)
+        best_index = int(scores.argmin())
+        best_prediction = predictions[best_index]
+        best_score = scores[best_index]
         
         logger.info(f"Selected best prediction with aspect ratio score: {best_score:.3f}")
         logger.debug(f"Best prediction dimensions: {best_prediction['width']}x{best_prediction['height']}")
@@ -145,22 +794,112 @@ class InferenceService:
             Tuple of (all_predictions, best_prediction)
             
         Raises:
-            ValueError: If no labels are detected
+            NoLabelsError: If no labels are detected
+            ValueError: If image_input type is not supported
         """
         results = self.infer_image(image_input)
         predictions = results.get("predictions", [])
         
         if not predictions:
-            raise ValueError("No shipping labels detected in image")
+            raise NoLabelsError("No shipping labels detected in image")
         
         best_prediction = self.pick_best_prediction(predictions)
         
         return predictions, best_prediction
+    
+    def detect_labels_batch(
+        self, 
+        images: List[Union[str, Path, Image.Image]]
+    ) -> List[Optional[tuple[List[Dict[str, Any]], Dict[str, Any]]]]:
+        """
+        Detect shipping labels in several images, inferring them in parallel.
+        
+        Requests fan out over a pool of batch_workers threads, so the batch
+        takes roughly one round-trip instead of one per image; the shared
+        request limit still applies.
+        
+        Args:
+            images: File paths and/or PIL Image objects
+            
+        Returns:
+            One entry per image, in order: (all_predictions, best_prediction),
+            or None if no labels were detected in that image
+            
+        Raises:
+            InferenceError: If an inference request fails
+            ValueError: If an image input type is not supported
+        """
+        def detect(image_input):
+            try:
+                return self.detect_labels(image_input)
+            except NoLabelsError:
+                return None
+        
+        if self.batch_workers <= 1 or len(images) <= 1:
+            return [detect(image_input) for image_input in images]
+        
+        with self._pool_lock:
+            if self._batch_pool is None:
+                self._batch_pool = ThreadPoolExecutor(
+                    max_workers=self.batch_workers,
+                    thread_name_prefix="infer"
+                )
+        
+        futures = [self._batch_pool.submit(detect, image_input) for image_input in images]
+        try:
+            return [future.result() for future in futures]
+        except BaseException:
+            # Don't spend API calls on a batch that has already failed
+            for future in futures:
+                future.cancel()
+            raise
+    
+    async def detect_labels_async(
+        self, 
+        image_input: Union[str, Path, Image.Image]
+    ) -> tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Async counterpart of detect_labels() built on infer_image_async().
+        
+        Raises:
+            NoLabelsError: If no labels are detected
+            ValueError: If image_input type is not supported
+        """
+        results = await self.infer_image_async(image_input)
+        predictions = results.get("predictions", [])
+        
+        if not predictions:
+            raise NoLabelsError("No shipping labels detected in image")
+        
+        best_prediction = self.pick_best_prediction(predictions)
+        
+        return predictions, best_prediction
+
+
+@lru_cache(maxsize=1)
+def get_inference_service() -> InferenceService:
+    """
+    Get the shared inference service, creating it on first use.
+    
+    Returns:
+        Cached InferenceService instance configured from settings
+    """
+    settings = get_settings()
+    return InferenceService(
+        api_key=settings.roboflow_api_key,
+        model_id=settings.model_id,
+        confidence_threshold=settings.confidence_thresh,
+        batch_workers=settings.max_concurrent_inferences,
+        cache=(
+            InferenceCache(settings.inference_cache_dir, settings.inference_cache_size)
+            if settings.inference_cache_size
+            else None
+        )
+    )
 
 
-# Global inference service instance
-inference_service = InferenceService(
-    api_key=settings.roboflow_api_key,
-    model_id=settings.model_id,
-    confidence_threshold=settings.confidence_thresh
-)
\ No newline at end of file
+def __getattr__(name: str):
+    """Keep `from services.inference import inference_service` working, lazily."""
+    if name == "inference_service":
+        return get_inference_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
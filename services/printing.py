@@ -6,17 +6,28 @@ system detection, and comprehensive error handling.
 """
 
 import logging
+import shutil
 import subprocess
 import platform
-import tempfile
+import threading
+import time
 import os
-from typing import Tuple, Dict, Any, Union
+from typing import Tuple, Dict, Any, Callable, Optional, Union
 from pathlib import Path
 from datetime import datetime
+from functools import lru_cache
+from io import BytesIO
 
 from PIL import Image, ImageDraw
 
-from config import settings, TEMP_DIR
+# pycups talks IPP to cupsd directly; fall back to the lp/lpr command line
+# tools when it isn't installed
+try:
+    import cups
+except ImportError:
+    cups = None
+
+from config import get_settings, PNG_COMPRESS_LEVEL, PRINT_SETUP_TTL, TEMP_DIR
 
 
 logger = logging.getLogger(__name__)
@@ -37,8 +48,20 @@ class PrintService:
     
     def __init__(self):
         """Initialize the print service."""
-        self.temp_dir = TEMP_DIR
-        self.temp_dir.mkdir(exist_ok=True, parents=True)
+        self.temp_dir = TEMP_DIR  # Created by config.ensure_directories()
+        self._setup_cache: Optional[Dict[str, Any]] = None
+        self._setup_expires = 0.0
+        self._setup_lock = threading.Lock()
+        self._test_background: Optional[Image.Image] = None
+        # Settings are fixed for the life of the process, so the command is resolved once
+        self._print_command: Optional[list[str]] = None
+        # Long-lived CUPS connection, opened on first print when available.
+        # After a failed connection attempt, the print command is used until
+        # _cups_retry_at (time.monotonic()), then CUPS is tried again
+        self._cups_connection = None
+        self._cups_printer: Optional[str] = None
+        self._cups_retry_at = 0.0
+        self._cups_lock = threading.Lock()
         logger.info("Initialized print service")
     
     def print_label_file(self, image_path: Union[str, Path]) -> Tuple[bool, str]:
@@ -54,42 +77,219 @@ class PrintService:
         Raises:
             PrintingError: If printing is disabled or fails critically
         """
+        settings = get_settings()
         if not settings.print_enabled:
             raise PrintingError("Printing is disabled in configuration")
         
         image_path = str(image_path)  # Ensure string path
         
-        if not os.path.exists(image_path):
+        # A single stat both checks the file exists and gives its size for debugging
+        try:
+            file_size = os.stat(image_path).st_size
+        except OSError:
             raise PrintingError(f"Print file does not exist: {image_path}")
         
+        if settings.print_debug:
+            logger.debug(f"🖨️  File size: {file_size} bytes")
+        
+        result = self._print_cups(
+            lambda connection, printer: connection.printFile(printer, image_path, "linecook", {})
+        )
+        if result is None:
+            # Build full command with file path
+            result = self._run_print_job([image_path])
+        success, message = result
+        if success:
+            logger.info(f"Print job submitted for: {image_path}")
+        return success, message
+    
+    def print_label_bytes(self, image_data: bytes) -> Tuple[bool, str]:
+        """
+        Print an encoded label image without writing it to disk first.
+        
+        Like print_label_file(), the job goes over the CUPS connection when
+        available. Otherwise it is piped to the print command's stdin; lp and
+        lpr read the job from stdin when no file is given.
+        
+        Args:
+            image_data: Encoded image bytes (e.g. PNG) to print
+            
+        Returns:
+            Tuple of (success: bool, message: str)
+            
+        Raises:
+            PrintingError: If printing is disabled
+        """
+        settings = get_settings()
+        if not settings.print_enabled:
+            raise PrintingError("Printing is disabled in configuration")
+        
+        if settings.print_debug:
+            logger.debug(f"🖨️  Printing {len(image_data)} bytes from memory")
+        
+        def submit(connection, printer: str) -> int:
+            job_id = connection.createJob(printer, "linecook", {})
+            try:
+                connection.startDocument(printer, job_id, "linecook", cups.CUPS_FORMAT_AUTO, 1)
+                connection.writeRequestData(image_data, len(image_data))
+                connection.finishDocument(printer)
+            except Exception:
+                # Don't leave a held, empty job behind
+                try:
+                    connection.cancelJob(job_id)
+                except Exception:
+                    pass
+                raise
+            return job_id
+        
+        result = self._print_cups(submit)
+        if result is None:
+            result = self._run_print_job([], input_data=image_data)
+        success, message = result
+        if success:
+            logger.info(f"Print job submitted from memory ({len(image_data)} bytes)")
+        return success, message
+    
+    def _get_cups(self) -> Optional[Tuple[Any, str]]:
+        """
+        Connect to CUPS if needed and return the connection and its default printer.
+        
+        Only used with PRINT_COMMAND=auto; a custom command may carry options
+        that the subprocess path has to pass through. A failed connection is
+        retried after PRINT_SETUP_TTL seconds.
+        
+        Returns:
+            Tuple of (connection, printer), or None if CUPS can't be used
+        """
+        if cups is None or get_settings().print_command != "auto":
+            return None
+        
+        with self._cups_lock:
+            if self._cups_connection is None and time.monotonic() >= self._cups_retry_at:
+                self._cups_retry_at = time.monotonic() + PRINT_SETUP_TTL
+                try:
+                    connection = cups.Connection()
+                    printer = connection.getDefault()
+                    if printer:
+                        self._cups_connection, self._cups_printer = connection, printer
+                        logger.info(f"Printing through CUPS to default printer: {printer}")
+                    else:
+                        logger.info("No default CUPS printer, using print command")
+                except Exception as e:
+                    logger.warning(f"Could not connect to CUPS, using print command: {str(e)}")
+            
+            if self._cups_connection is None:
+                return None
+            return self._cups_connection, self._cups_printer
+    
+    def _drop_cups(self, retry_after: float = 0.0) -> None:
+        """Discard the CUPS connection, reconnecting on the next print after retry_after seconds."""
+        with self._cups_lock:
+            self._cups_connection = None
+            self._cups_printer = None
+            self._cups_retry_at = time.monotonic() + retry_after
+    
+    def _print_cups(self, submit: Callable[[Any, str], int]) -> Optional[Tuple[bool, str]]:
+        """
+        Submit a job over the persistent CUPS connection.
+        
+        cupsd restarts and dropped connections leave the cached connection
+        unusable, so after a connection-level error (an HTTP error, or IPP
+        service-unavailable) it is dropped and the job retried once on a fresh
+        connection. If that fails too, the caller falls back to the print
+        command, and CUPS is not tried again for PRINT_SETUP_TTL seconds.
+        
+        Any other error means cupsd received the request, and it may already
+        have queued the job. That error is reported as a failed print and is
+        not resubmitted, so a label is never printed twice.
+        
+        Args:
+            submit: Called with (connection, printer) to submit the job;
+                returns the CUPS job id
+        
+        Returns:
+            Tuple of (success: bool, message: str), or None if the job should
+            go through the print command instead
+        """
+        for _ in range(2):
+            cups_target = self._get_cups()
+            if cups_target is None:
+                return None
+            connection, printer = cups_target
+            
+            try:
+                # cups.Connection isn't thread-safe
+                with self._cups_lock:
+                    job_id = submit(connection, printer)
+                return True, f"Print job {job_id} submitted to {printer} via CUPS"
+            except cups.HTTPError as e:
+                logger.warning(f"🖨️  CUPS connection failed, reconnecting: {str(e)}")
+            except cups.IPPError as e:
+                status = e.args[0] if e.args else None
+                if status != cups.IPP_SERVICE_UNAVAILABLE:
+                    error_msg = f"CUPS rejected the print job: {e.args[-1] if e.args else e}"
+                    logger.error(f"🖨️  {error_msg}")
+                    return False, error_msg
+                logger.warning(f"🖨️  CUPS unavailable, reconnecting: {str(e)}")
+            except Exception as e:
+                error_msg = f"CUPS print failed: {str(e)}"
+                logger.error(f"🖨️  {error_msg}")
+                return False, error_msg
+            self._drop_cups()
+        
+        logger.warning("🖨️  CUPS print failed after reconnecting, using print command")
+        self._drop_cups(retry_after=PRINT_SETUP_TTL)
+        return None
+    
+    def _run_print_job(
+        self, 
+        args: list[str], 
+        input_data: Optional[bytes] = None
+    ) -> Tuple[bool, str]:
+        """
+        Run the configured print command and describe the outcome.
+        
+        This is the single execution path behind print_label_file() and
+        print_label_bytes().
+        
+        Args:
+            args: Arguments appended to the print command (e.g. the file path)
+            input_data: Optional bytes to send to the command's stdin
+            
+        Returns:
+            Tuple of (success: bool, message: str)
+        """
+        settings = get_settings()
+        cmd: list[str] = []
+        cmd_str = "N/A"
         try:
             # Determine print command based on configuration
             cmd = self._get_print_command()
-            
-            # Build full command with file path
-            full_cmd = cmd + [image_path]
+            full_cmd = cmd + args
+            cmd_str = ' '.join(full_cmd)
             
             if settings.print_debug:
-                logger.debug(f"🖨️  Executing print command: {' '.join(full_cmd)}")
-                logger.debug(f"🖨️  File exists: {os.path.exists(image_path)}")
-                logger.debug(f"🖨️  File size: {os.path.getsize(image_path)} bytes")
+                logger.debug(f"🖨️  Executing print command: {cmd_str}")
             
             # Execute the print command with timeout
             result = subprocess.run(
                 full_cmd,
+                input=input_data,
                 check=True,
                 capture_output=True,
-                text=True,
                 timeout=settings.api_timeout  # Use configurable timeout
             )
             
             success_msg = f"Print job submitted successfully using: {' '.join(cmd)}"
             if settings.print_debug and result.stdout:
-                success_msg += f"\\nOutput: {result.stdout.strip()}"
+                success_msg += f"\\nOutput: {result.stdout.decode(errors='replace').strip()}"
             
-            logger.info(f"Print job submitted for: {image_path}")
             return True, success_msg
             
+        except PrintingError as e:
+            logger.error(f"🖨️  {e}")
+            return False, str(e)
+            
         except subprocess.TimeoutExpired:
             error_msg = f"Print command timed out after {settings.api_timeout} seconds"
             logger.error(f"🖨️  {error_msg}")
@@ -98,17 +298,17 @@ class PrintService:
         except subprocess.CalledProcessError as e:
             error_msg = f"Print command failed with exit code {e.returncode}"
             if e.stderr:
-                error_msg += f": {e.stderr.strip()}"
+                error_msg += f": {e.stderr.decode(errors='replace').strip()}"
             logger.error(f"🖨️  {error_msg}")
             if settings.print_debug:
-                logger.debug(f"🖨️  Command: {' '.join(full_cmd)}")
+                logger.debug(f"🖨️  Command: {cmd_str}")
             return False, error_msg
             
         except FileNotFoundError:
             error_msg = f"Print command not found: {cmd[0] if cmd else 'unknown'}"
             logger.error(f"🖨️  {error_msg}")
             if settings.print_debug:
-                logger.debug(f"🖨️  Full command: {' '.join(full_cmd) if 'full_cmd' in locals() else 'N/A'}")
+                logger.debug(f"🖨️  Full command: {cmd_str}")
             return False, error_msg
             
         except Exception as e:
@@ -122,12 +322,21 @@ class PrintService:
         """
         Determine the appropriate print command based on configuration.
         
+        The result is cached after the first successful lookup.
+        
         Returns:
             List of command components
             
         Raises:
             PrintingError: If no suitable print command is found
         """
+        if self._print_command is None:
+            self._print_command = self._resolve_print_command()
+        return self._print_command
+    
+    def _resolve_print_command(self) -> list[str]:
+        """Build the print command from settings and the operating system."""
+        settings = get_settings()
         if settings.print_command == "auto":
             # Auto-detect based on operating system
             system = platform.system()
@@ -157,6 +366,7 @@ class PrintService:
         Returns:
             Dictionary with detailed information about print configuration and system state
         """
+        settings = get_settings()
         info = {
             "print_enabled": settings.print_enabled,
             "print_command": settings.print_command,
@@ -167,24 +377,10 @@ class PrintService:
             "timeout": settings.api_timeout
         }
         
-        # Check available print commands
+        # Check available print commands (a PATH lookup, no need to run them)
         commands_to_check = ["lpr", "lp", "lpstat", "lpq"]
         for cmd in commands_to_check:
-            try:
-                result = subprocess.run(
-                    [cmd, "--help"], 
-                    capture_output=True, 
-                    timeout=5,
-                    text=True
-                )
-                info["available_commands"][cmd] = "available"
-                logger.debug(f"Print command {cmd} is available")
-            except FileNotFoundError:
-                info["available_commands"][cmd] = "not found"
-            except subprocess.TimeoutExpired:
-                info["available_commands"][cmd] = "timeout"
-            except Exception as e:
-                info["available_commands"][cmd] = f"error: {str(e)}"
+            info["available_commands"][cmd] = "available" if shutil.which(cmd) else "not found"
         
         # Try to get list of printers
         try:
@@ -207,53 +403,83 @@ class PrintService:
         
         return info
     
-    def create_test_image(self) -> str:
+    def get_cached_setup(self) -> Dict[str, Any]:
+        """
+        Get print setup information, probing the system at most once per TTL.
+        
+        check_print_setup() runs lpstat; its answers rarely change, so the
+        result is reused for PRINT_SETUP_TTL seconds, or until
+        invalidate_setup() is called.
+        
+        Returns:
+            Dictionary with print configuration and system state
+        """
+        with self._setup_lock:
+            now = time.monotonic()
+            if self._setup_cache is None or now >= self._setup_expires:
+                self._setup_cache = self.check_print_setup()
+                self._setup_expires = now + PRINT_SETUP_TTL
+            return self._setup_cache
+    
+    def invalidate_setup(self) -> None:
+        """Discard cached print setup information so the next lookup re-probes."""
+        with self._setup_lock:
+            self._setup_cache = None
+            self._setup_expires = 0.0
+    
+    def _render_test_image(self) -> Image.Image:
+        """Draw the 4x6 inch print test page with current system information."""
+        settings = get_settings()
+        
+        # The border never changes, so it's drawn once and only the text is
+        # redrawn on a copy for each test
+        if self._test_background is None:
+            # Create a 4x6 inch test image at 300 DPI
+            width, height = 1200, 1800
+            background = Image.new('RGB', (width, height), 'white')
+            ImageDraw.Draw(background).rectangle(
+                [50, 50, width-50, height-50], outline='black', width=5
+            )
+            self._test_background = background
+        
+        image = self._test_background.copy()
+        draw = ImageDraw.Draw(image)
+        
+        # Add text content (PIL default font)
+        y_offset = 100
+        line_height = 80
+        
+        test_lines = [
+            "LINECOOK PRINT TEST",
+            f"Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+            f"System: {platform.system()}",
+            f"Print Command: {settings.print_command}",
+            f"Print Enabled: {settings.print_enabled}",
+            f"Print Debug: {settings.print_debug}"
+        ]
+        
+        for line in test_lines:
+            draw.text((100, y_offset), line, fill='black')
+            y_offset += line_height
+        
+        return image
+    
+    def create_test_image_bytes(self) -> bytes:
         """
-        Create a test image for print testing.
+        Create a test image for print testing as encoded PNG bytes.
         
         Returns:
-            Path to the created test image
+            PNG bytes of the test image
             
         Raises:
             PrintingError: If test image creation fails
         """
         try:
-            # Create a 4x6 inch test image at 300 DPI
-            width, height = 1200, 1800
-            image = Image.new('RGB', (width, height), 'white')
-            draw = ImageDraw.Draw(image)
-            
-            # Draw test content
-            draw.rectangle([50, 50, width-50, height-50], outline='black', width=5)
-            
-            # Add text content (PIL default font)
-            y_offset = 100
-            line_height = 80
-            
-            test_lines = [
-                "LINECOOK PRINT TEST",
-                f"Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-                f"System: {platform.system()}",
-                f"Print Command: {settings.print_command}",
-                f"Print Enabled: {settings.print_enabled}",
-                f"Print Debug: {settings.print_debug}"
-            ]
-            
-            for line in test_lines:
-                draw.text((100, y_offset), line, fill='black')
-                y_offset += line_height
-            
-            # Save to temporary file
-            temp_file = tempfile.NamedTemporaryFile(
-                dir=self.temp_dir,
-                suffix=".png",
-                delete=False
+            buffer = BytesIO()
+            self._render_test_image().save(
+                buffer, 'PNG', optimize=False, compress_level=PNG_COMPRESS_LEVEL
             )
-            image.save(temp_file.name, 'PNG')
-            temp_file.close()
-            
-            logger.info(f"Created test image: {temp_file.name}")
-            return temp_file.name
+            return buffer.getvalue()
             
         except Exception as e:
             logger.error(f"Error creating test image: {str(e)}")
@@ -263,6 +489,9 @@ class PrintService:
         """
         Perform a comprehensive print test.
         
+        The test page is rendered in memory and piped to the print command,
+        so nothing is written to disk.
+        
         Returns:
             Dictionary with test results and system information
             
@@ -271,30 +500,26 @@ class PrintService:
         """
         try:
             # Create test image
-            test_image_path = self.create_test_image()
+            test_image = self.create_test_image_bytes()
             
             # Attempt to print
-            success, message = self.print_label_file(test_image_path)
+            success, message = self.print_label_bytes(test_image)
             
             # Get system information
-            setup_info = self.check_print_setup()
+            setup_info = self.get_cached_setup()
             
             result = {
                 "test_attempted": True,
                 "print_success": success,
                 "print_message": message,
-                "test_image_path": test_image_path,
+                # The test page is never written to disk; the path and cleanup
+                # keys are kept for existing clients
+                "test_image_path": None,
+                "test_image_size": len(test_image),
                 "setup_info": setup_info
             }
-            
-            # Clean up test file if print was successful
             if success:
-                try:
-                    os.unlink(test_image_path)
-                    result["test_image_cleaned"] = True
-                except Exception as e:
-                    logger.warning(f"Could not clean up test image: {str(e)}")
-                    result["test_image_cleaned"] = False
+                result["test_image_cleaned"] = True
             
             return result
             
@@ -303,8 +528,23 @@ class PrintService:
             raise PrintingError(f"Print test failed: {str(e)}")
 
 
-# Global print service instance
-print_service = PrintService()
-
 # Alias for backward compatibility
-PrintingService = PrintService
\ No newline at end of file
+PrintingService = PrintService
+
+
+@lru_cache(maxsize=1)
+def get_print_service() -> PrintService:
+    """
+    Get the shared print service, creating it on first use.
+    
+    Returns:
+        Cached PrintService instance
+    """
+    return PrintService()
+
+
+def __getattr__(name: str):
+    """Keep `from services.printing import print_service` working, lazily."""
+    if name == "print_service":
+        return get_print_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -6,7 +6,7 @@
 class LineCookApp {
     constructor() {
         this.selectedFile = null;
-        this.processedImageData = null;
+        this.processedImageUrl = null;
         this.initializeElements();
         this.setupEventListeners();
     }
@@ -179,11 +179,11 @@ class LineCookApp {
     }
 
     displayResults(result, wasPrintRequest) {
-        // Store image data for download
-        this.processedImageData = result.image_data;
+        // Store image URL for download
+        this.processedImageUrl = result.label_url;
 
         // Display processed image
-        this.processedImage.src = `data:image/png;base64,${result.image_data}`;
+        this.processedImage.src = result.label_url;
 
         // Display label information
         const dimensions = result.label_dimensions;
@@ -209,25 +209,15 @@ class LineCookApp {
     }
 
     downloadProcessedImage() {
-        if (!this.processedImageData) {
+        if (!this.processedImageUrl) {
             this.showMessage('No processed image available to download.', 'error');
             return;
         }
 
         try {
-            // Convert base64 to blob
-            const byteCharacters = atob(this.processedImageData);
-            const byteNumbers = new Array(byteCharacters.length);
-            for (let i = 0; i < byteCharacters.length; i++) {
-                byteNumbers[i] = byteCharacters.charCodeAt(i);
-            }
-            const byteArray = new Uint8Array(byteNumbers);
-            const blob = new Blob([byteArray], { type: 'image/png' });
-
             // Create download link
-            const url = URL.createObjectURL(blob);
             const link = document.createElement('a');
-            link.href = url;
+            link.href = this.processedImageUrl;
             
             // Generate filename based on original file
             const originalName = this.selectedFile ? this.selectedFile.name : 'processed_label';
@@ -239,9 +229,6 @@ class LineCookApp {
             link.click();
             document.body.removeChild(link);
 
-            // Clean up
-            URL.revokeObjectURL(url);
-
             this.showMessage('Label downloaded successfully!', 'success');
         } catch (error) {
             console.error('Download error:', error);
@@ -268,7 +255,7 @@ class LineCookApp {
 
     hideResults() {
         this.resultsSection.style.display = 'none';
-        this.processedImageData = null;
+        this.processedImageUrl = null;
     }
 }
 
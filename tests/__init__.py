@@ -0,0 +1,10 @@
+"""
+LineCook test suite.
+
+Settings require a Roboflow API key, so a placeholder is set before any test
+module imports config.
+"""
+
+import os
+
+os.environ.setdefault("ROBOFLOW_API_KEY", "test-key")
@@ -0,0 +1,24 @@
+"""
+Helpers shared by the test modules.
+"""
+
+import os
+import unittest
+from unittest import mock
+
+from config import get_settings
+
+
+def override_settings(test: unittest.TestCase, **values: str) -> None:
+    """
+    Apply settings overrides through the environment for the rest of a test.
+    
+    Args:
+        test: Test case whose cleanups restore the environment and settings
+        **values: Setting names and their environment variable values
+    """
+    patcher = mock.patch.dict(os.environ, {name.upper(): value for name, value in values.items()})
+    patcher.start()
+    get_settings.cache_clear()
+    test.addCleanup(get_settings.cache_clear)
+    test.addCleanup(patcher.stop)
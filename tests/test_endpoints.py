@@ -0,0 +1,290 @@
+"""
+Tests for the FastAPI endpoints: upload limits, stored results and the result cache.
+"""
+
+import base64
+import os
+import tempfile
+import unittest
+from collections import OrderedDict
+from io import BytesIO
+from pathlib import Path
+from unittest import mock
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+import api.endpoints as endpoints
+from config import MULTIPART_OVERHEAD
+from services.image_processing import get_image_processor
+from services.inference import InferenceService
+from tests.support import override_settings
+
+
+PREDICTION = {"x": 300, "y": 450, "width": 400, "height": 600, "confidence": 0.9}
+
+
+def _png_bytes(size=(600, 900)) -> bytes:
+    buffer = BytesIO()
+    Image.new("RGB", size, "white").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class EndpointTestCase(unittest.TestCase):
+    """Isolate stored results and the in-memory result cache per test."""
+
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._temp_dir.cleanup)
+        self.results_dir = Path(self._temp_dir.name)
+        for patcher in (
+            mock.patch.object(endpoints, "RESULTS_DIR", self.results_dir),
+            mock.patch.object(get_image_processor(), "temp_dir", self.results_dir),
+            mock.patch.object(endpoints, "_result_cache", OrderedDict()),
+            mock.patch.object(endpoints, "_result_cache_bytes", 0),
+            mock.patch.object(endpoints, "_next_results_prune", 0.0),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = TestClient(endpoints.app)
+
+    def _mock_detection(self):
+        """Answer every image upload with PREDICTION instead of calling the API."""
+        patcher = mock.patch.object(
+            InferenceService, "detect_labels_async", return_value=([PREDICTION], PREDICTION)
+        )
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def _upload(self, data: bytes, **params):
+        return self.client.post(
+            "/create_labels", params=params, files={"file": ("label.png", data, "image/png")}
+        )
+
+
+class LabelResultsTest(EndpointTestCase):
+    """Labels are returned by URL, served from /results and expire after results_ttl."""
+
+    def setUp(self):
+        super().setUp()
+        self._mock_detection()
+
+    def test_label_url_serves_png(self):
+        response = self._upload(_png_bytes())
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body["label_dimensions"], {"width": 400, "height": 600})
+        self.assertNotIn("image_data", body)
+
+        label = self.client.get(body["label_url"])
+        self.assertEqual(label.status_code, 200)
+        self.assertEqual(label.headers["content-type"], "image/png")
+        self.assertEqual(Image.open(BytesIO(label.content)).size, (400, 600))
+
+    def test_unknown_label_is_not_found(self):
+        self.assertEqual(self.client.get("/results/not-a-label.png").status_code, 404)
+        self.assertEqual(self.client.get(f"/results/{'0' * 32}.png").status_code, 404)
+
+    def test_expired_label_is_pruned(self):
+        override_settings(self, results_ttl="600")
+        label_url = self._upload(_png_bytes()).json()["label_url"]
+        label_path = self.results_dir / Path(label_url).name
+        os.utime(label_path, (0, 0))
+
+        endpoints._next_results_prune = 0.0
+        endpoints._prune_results()
+
+        self.assertFalse(label_path.exists())
+        self.assertEqual(self.client.get(label_url).status_code, 404)
+
+    def test_prune_is_throttled(self):
+        override_settings(self, results_ttl="600")
+        endpoints._prune_results()
+        expired = self.results_dir / f"{'0' * 32}.png"
+        expired.write_bytes(b"png")
+        os.utime(expired, (0, 0))
+
+        # Within results_ttl / 10 of the last sweep, nothing is scanned
+        endpoints._prune_results()
+
+        self.assertTrue(expired.exists())
+
+
+class UploadLimitTest(EndpointTestCase):
+    """Oversized uploads are rejected with 413 however the body is sent."""
+
+    MAX_FILE_SIZE = 1000
+
+    def setUp(self):
+        super().setUp()
+        override_settings(self, max_file_size=str(self.MAX_FILE_SIZE))
+        self.limit = self.MAX_FILE_SIZE + MULTIPART_OVERHEAD
+
+    def _post(self, content, **headers):
+        return self.client.post(
+            "/create_labels",
+            content=content,
+            headers={"content-type": "multipart/form-data; boundary=boundary", **headers}
+        )
+
+    def test_declared_content_length_over_limit(self):
+        response = self._post(b"x" * (self.limit + 1))
+
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(response.json(), {"detail": "Upload exceeds maximum allowed size"})
+
+    def test_chunked_body_over_limit(self):
+        def chunks():
+            yield (
+                b'--boundary\r\nContent-Disposition: form-data; name="file"; filename="label.png"\r\n'
+                b"Content-Type: image/png\r\n\r\n"
+            )
+            for _ in range(self.limit // 8192 + 2):
+                yield b"x" * 8192
+            yield b"\r\n--boundary--\r\n"
+
+        response = self._post(chunks())
+
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(response.json(), {"detail": "Upload exceeds maximum allowed size"})
+
+    def test_file_over_max_size_within_multipart_allowance(self):
+        response = self.client.post(
+            "/create_labels",
+            files={"file": ("label.png", b"x" * (self.MAX_FILE_SIZE + 1), "image/png")}
+        )
+
+        self.assertEqual(response.status_code, 413)
+        self.assertIn("File exceeds maximum allowed size", response.json()["detail"])
+
+
+class ResultCacheTest(EndpointTestCase):
+    """The result cache holds encoded labels within result_cache_bytes."""
+
+    def setUp(self):
+        super().setUp()
+        override_settings(self, result_cache_bytes="100")
+
+    def _cache(self, key, size):
+        endpoints._cache_result((key, ".png", "png"), b"x" * size, (1, 1), PREDICTION)
+
+    def _keys(self):
+        return [digest for digest, _, _ in endpoints._result_cache]
+
+    def test_evicts_least_recently_used_beyond_budget(self):
+        self._cache(b"a", 40)
+        self._cache(b"b", 40)
+        self.assertIsNotNone(endpoints._get_cached_result((b"a", ".png", "png")))
+        self._cache(b"c", 40)
+
+        self.assertEqual(self._keys(), [b"a", b"c"])
+        self.assertEqual(endpoints._result_cache_bytes, 80)
+        self.assertIsNone(endpoints._get_cached_result((b"b", ".png", "png")))
+
+    def test_replacing_entry_updates_size(self):
+        self._cache(b"a", 40)
+        self._cache(b"a", 60)
+
+        self.assertEqual(endpoints._result_cache_bytes, 60)
+        self.assertEqual(len(endpoints._get_cached_result((b"a", ".png", "png"))[0]), 60)
+
+    def test_entry_larger_than_budget_is_not_cached(self):
+        self._cache(b"a", 40)
+        self._cache(b"big", 101)
+
+        self.assertEqual(self._keys(), [b"a"])
+        self.assertEqual(endpoints._result_cache_bytes, 40)
+
+    def test_disabled_cache_stores_nothing(self):
+        override_settings(self, result_cache_bytes="0")
+        self._cache(b"a", 1)
+
+        self.assertEqual(self._keys(), [])
+
+    def test_identical_upload_reuses_result(self):
+        override_settings(self, result_cache_bytes=str(1024 * 1024))
+        detect_labels = self._mock_detection()
+        data = _png_bytes()
+        first = self._upload(data).json()
+        second = self._upload(data).json()
+
+        detect_labels.assert_called_once()
+        self.assertEqual(second["label_dimensions"], first["label_dimensions"])
+        self.assertNotEqual(second["label_url"], first["label_url"])
+        self.assertEqual(
+            Image.open(BytesIO(self.client.get(second["label_url"]).content)).size, (400, 600)
+        )
+
+    def test_embedded_miss_encodes_only_jpeg(self):
+        override_settings(self, result_cache_bytes=str(1024 * 1024))
+        detect_labels = self._mock_detection()
+        data = _png_bytes()
+
+        with mock.patch.object(endpoints, "_encode_png", wraps=endpoints._encode_png) as encode_png:
+            first = self._upload(data, embed="true").json()
+            second = self._upload(data, embed="true").json()
+
+        encode_png.assert_not_called()
+        detect_labels.assert_called_once()
+        self.assertEqual(first["image_format"], "jpeg")
+        self.assertEqual(second["image_format"], "jpeg")
+        self.assertEqual(second["image_data"], first["image_data"])
+
+    def test_other_encoding_is_a_miss(self):
+        override_settings(self, result_cache_bytes=str(1024 * 1024))
+        detect_labels = self._mock_detection()
+        data = _png_bytes()
+
+        self._upload(data, embed="true")
+        response = self._upload(data).json()
+
+        self.assertEqual(detect_labels.call_count, 2)
+        self.assertIn("label_url", response)
+
+
+class EncodeBufferTest(unittest.TestCase):
+    """Pooled encode buffers are reused without truncation, so reads stop at tell()."""
+
+    def setUp(self):
+        override_settings(self, max_workers="1")
+        patcher = mock.patch.object(endpoints, "_encode_buffers", [])
+        self.pool = patcher.start()
+        self.addCleanup(patcher.stop)
+        # Noise keeps the first encode far larger than the white image after it
+        self.large = Image.effect_noise((400, 400), 64).convert("RGB")
+        self.small = Image.new("RGB", (20, 30), "white")
+
+    def test_png_after_larger_png_has_no_trailing_bytes(self):
+        large_png = endpoints._encode_png(self.large)
+        buffer = self.pool[0]
+        small_png = endpoints._encode_png(self.small)
+
+        self.assertIs(self.pool[0], buffer)
+        self.assertGreater(len(buffer.getvalue()), len(small_png))
+        self.assertLess(len(small_png), len(large_png))
+
+        expected = BytesIO()
+        self.small.save(expected, format="PNG", compress_level=endpoints.PNG_COMPRESS_LEVEL)
+        self.assertEqual(small_png, expected.getvalue())
+        with Image.open(BytesIO(small_png)) as image:
+            self.assertEqual(image.size, (20, 30))
+
+    def test_jpeg_after_larger_png_has_no_trailing_bytes(self):
+        endpoints._encode_png(self.large)
+        jpeg_b64 = endpoints._encode_jpeg_b64(self.small)
+
+        with Image.open(BytesIO(base64.b64decode(jpeg_b64))) as image:
+            self.assertEqual(image.format, "JPEG")
+            self.assertEqual(image.size, (20, 30))
+        self.assertTrue(base64.b64decode(jpeg_b64).endswith(b"\xff\xd9"))
+
+    def test_pool_keeps_two_buffers_per_worker(self):
+        with endpoints._encode_buffer(), endpoints._encode_buffer(), endpoints._encode_buffer():
+            pass
+
+        self.assertEqual(len(self.pool), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
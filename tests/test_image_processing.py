@@ -0,0 +1,156 @@
+"""
+Tests for PDF label extraction in the image processor.
+"""
+
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from PIL import Image
+
+import services.image_processing as image_processing
+from config import DEFAULT_DPI, DETECT_DPI
+from services.image_processing import ImageProcessor
+from services.inference import NoLabelsError
+
+
+def _render_page(page_index: int, dpi: int) -> Image.Image:
+    """A blank US Letter page at dpi, tagged with its page number."""
+    page = Image.new("RGB", (int(8.5 * dpi), 11 * dpi), (page_index, 0, 0))
+    page.info["page"] = page_index
+    return page
+
+
+class PdfProcessingTest(unittest.TestCase):
+    """PDF pages are detected at DETECT_DPI and the label cropped from a DEFAULT_DPI page."""
+
+    def setUp(self):
+        self.processor = ImageProcessor()
+        self.n_pages = 1
+        self.labels = {}
+        self.renders = []
+        self.detected = []
+        self.executors = []
+        # Detection on held pages blocks until release is set
+        self.held = set()
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+        self.barrier = None
+
+        for name, side_effect in (
+            ("count_pdf_pages", lambda pdf_path: self.n_pages),
+            ("render_pdf_page", self._render),
+        ):
+            patcher = mock.patch.object(self.processor, name, side_effect=side_effect)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        service = mock.Mock()
+        service.detect_labels.side_effect = self._detect
+        patcher = mock.patch("services.inference.get_inference_service", return_value=service)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        def executor(**kwargs):
+            self.executors.append(ThreadPoolExecutor(**kwargs))
+            return self.executors[-1]
+
+        patcher = mock.patch.object(image_processing, "ThreadPoolExecutor", side_effect=executor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _render(self, pdf_path, page_index, dpi=DEFAULT_DPI):
+        self.renders.append((page_index, dpi))
+        return _render_page(page_index, dpi)
+
+    def _detect(self, page):
+        if page.info["page"] in self.held:
+            self.release.wait(5)
+        if self.barrier is not None:
+            self.barrier.wait(5)
+        self.detected.append((page.info["page"], page.size))
+        if page.info["page"] not in self.labels:
+            raise NoLabelsError("No labels detected")
+        prediction = self.labels[page.info["page"]]
+        return [prediction], prediction
+
+    def _process(self):
+        return self.processor._process_pdf_file("label.pdf", "label.pdf")
+
+    def test_box_detected_at_detect_dpi_is_cropped_from_full_page(self):
+        self.labels = {0: {"x": 200, "y": 300, "width": 100, "height": 200, "confidence": 0.9}}
+
+        cropped, error, best_pred = self._process()
+
+        self.assertIsNone(error)
+        self.assertEqual(self.detected, [(0, _render_page(0, DETECT_DPI).size)])
+        self.assertEqual(self.renders, [(0, DETECT_DPI), (0, DEFAULT_DPI)])
+        # 150 DPI coordinates are doubled for the 300 DPI page
+        self.assertEqual(
+            {key: best_pred[key] for key in ("x", "y", "width", "height")},
+            {"x": 400, "y": 600, "width": 200, "height": 400}
+        )
+        self.assertEqual(best_pred["confidence"], 0.9)
+        self.assertEqual(cropped.size, (200, 400))
+
+    def test_stops_at_first_page_with_label(self):
+        self.n_pages = 6
+        self.labels = {
+            page: {"x": 200, "y": 300, "width": 100, "height": 200, "confidence": 0.9}
+            for page in (1, 2)
+        }
+        self.held = {2, 3}
+        with mock.patch.object(image_processing, "PDF_MAX_WORKERS", 2):
+            cropped, error, best_pred = self._process()
+        self.release.set()
+        self.executors[0].shutdown(wait=True)
+
+        self.assertIsNone(error)
+        self.assertEqual(cropped.getpixel((0, 0)), (1, 0, 0))
+        self.assertEqual([page for page, dpi in self.renders if dpi == DEFAULT_DPI], [1])
+        # At most the two workers' next pages start; pages still queued are cancelled
+        detect_renders = {page for page, dpi in self.renders if dpi == DETECT_DPI}
+        self.assertTrue({0, 1} <= detect_renders <= {0, 1, 2, 3})
+
+    def test_pages_are_detected_concurrently(self):
+        self.n_pages = 3
+        self.labels = {2: {"x": 200, "y": 300, "width": 100, "height": 200, "confidence": 0.9}}
+        # Raises BrokenBarrierError unless all three pages are in flight at once
+        self.barrier = threading.Barrier(3)
+
+        cropped, error, _ = self._process()
+
+        self.assertIsNone(error)
+        self.assertEqual(cropped.getpixel((0, 0)), (2, 0, 0))
+
+    def test_earliest_labelled_page_wins(self):
+        self.n_pages = 2
+        self.labels = {
+            page: {"x": 200, "y": 300, "width": 100, "height": 200, "confidence": 0.9}
+            for page in (0, 1)
+        }
+        # Page 1 finishes first; page 0 is still the one used
+        self.held = {0}
+        timer = threading.Timer(0.05, self.release.set)
+        timer.start()
+        self.addCleanup(timer.cancel)
+
+        cropped, error, _ = self._process()
+
+        self.assertIsNone(error)
+        self.assertEqual(self.detected[0][0], 1)
+        self.assertEqual(cropped.getpixel((0, 0)), (0, 0, 0))
+        self.assertEqual([page for page, dpi in self.renders if dpi == DEFAULT_DPI], [0])
+
+    def test_no_label_on_any_page(self):
+        cropped, error, best_pred = self._process()
+
+        self.assertIsNone(cropped)
+        self.assertIsNone(best_pred)
+        self.assertEqual(error, "No shipping labels detected in PDF")
+        self.assertEqual(self.renders, [(0, DETECT_DPI)])
+
+
+if __name__ == "__main__":
+    unittest.main()
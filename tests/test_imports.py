@@ -0,0 +1,34 @@
+"""
+Tests that importing the application has no filesystem side effects.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+class ImportSideEffectsTest(unittest.TestCase):
+    """Directories are created by ensure_directories() at startup, not at import."""
+
+    def test_import_creates_no_directories(self):
+        with tempfile.TemporaryDirectory() as work_dir:
+            # StaticFiles checks that the static directory exists when mounted
+            os.symlink(REPO_ROOT / "static", Path(work_dir) / "static")
+            subprocess.run(
+                [sys.executable, "-c", "import main, api.endpoints"],
+                cwd=work_dir,
+                env={**os.environ, "PYTHONPATH": str(REPO_ROOT), "ROBOFLOW_API_KEY": "test-key"},
+                check=True
+            )
+
+            self.assertEqual(sorted(os.listdir(work_dir)), ["static"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,443 @@
+"""
+Tests for inference payload preparation and prediction selection.
+"""
+
+import asyncio
+import base64
+import random
+import tempfile
+import threading
+import time
+import unittest
+from io import BytesIO
+from pathlib import Path
+from unittest import mock
+
+import httpx
+from PIL import Image
+
+from config import TARGET_RATIOS
+from services.executor import run_blocking, shutdown_executor
+import services.inference as inference
+from services.inference import InferenceService, RequestLimiter
+from tests.support import override_settings
+
+
+def _service() -> InferenceService:
+    return InferenceService(api_key="test-key", model_id="model/1", reuse_session=False)
+
+
+def _legacy_pick_best_prediction(predictions):
+    """Scoring loop pick_best_prediction() replaced: nearest of every target ratio."""
+    def aspect_ratio_score(pred):
+        width, height = pred["width"], pred["height"]
+        if height == 0:
+            return float('inf')
+        ratio = width / height
+        return min(abs(ratio - target) for target in TARGET_RATIOS)
+
+    return min(predictions, key=aspect_ratio_score)
+
+
+class PickBestPredictionTest(unittest.TestCase):
+    """The vectorized scoring picks the same prediction as the original loop."""
+
+    def setUp(self):
+        self.service = _service()
+
+    def _prediction(self, width, height):
+        return {"x": 0, "y": 0, "width": width, "height": height, "confidence": 0.5}
+
+    def test_matches_legacy_scoring(self):
+        rng = random.Random(1234)
+        for _ in range(200):
+            predictions = [
+                self._prediction(rng.uniform(1, 2000), rng.choice([0, rng.uniform(1, 2000)]))
+                for _ in range(rng.randint(1, 12))
+            ]
+            self.assertIs(
+                self.service.pick_best_prediction(predictions),
+                _legacy_pick_best_prediction(predictions)
+            )
+
+    def test_zero_height_is_never_preferred(self):
+        predictions = [self._prediction(100, 0), self._prediction(1000, 10)]
+        self.assertIs(self.service.pick_best_prediction(predictions), predictions[1])
+
+    def test_empty_predictions(self):
+        with self.assertRaises(ValueError):
+            self.service.pick_best_prediction([])
+
+    def test_ratios_outside_targets(self):
+        # Very wide, very tall and exact-target boxes hit both ends of the search
+        predictions = [self._prediction(1000, 10), self._prediction(10, 1000), self._prediction(600, 400)]
+        self.assertIs(self.service.pick_best_prediction(predictions), predictions[2])
+
+    def test_ties_keep_first_prediction(self):
+        predictions = [self._prediction(400, 600), self._prediction(600, 400)]
+        self.assertIs(self.service.pick_best_prediction(predictions), predictions[0])
+
+
+class RawPayloadTest(unittest.TestCase):
+    """Upright JPEG and PNG files within max_infer_edge are sent as their own bytes."""
+
+    def setUp(self):
+        override_settings(self, max_infer_edge="1024")
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._temp_dir.cleanup)
+
+    def _save(self, name, size=(400, 600), **params):
+        path = Path(self._temp_dir.name) / name
+        Image.new("RGB", size, "white").save(path, **params)
+        return path
+
+    def _rotated_exif(self):
+        exif = Image.Exif()
+        exif[inference.EXIF_ORIENTATION] = 6
+        return exif
+
+    def _can_send_raw(self, path):
+        with Image.open(path) as image:
+            return InferenceService.can_send_raw(image)
+
+    def test_plain_jpeg_and_png_are_sent_raw(self):
+        self.assertTrue(self._can_send_raw(self._save("label.jpg")))
+        self.assertTrue(self._can_send_raw(self._save("label.png")))
+
+    def test_upright_exif_is_sent_raw(self):
+        exif = Image.Exif()
+        exif[inference.EXIF_ORIENTATION] = 1
+        self.assertTrue(self._can_send_raw(self._save("label.jpg", exif=exif)))
+
+    def test_rotated_jpeg_is_decoded(self):
+        self.assertFalse(self._can_send_raw(self._save("label.jpg", exif=self._rotated_exif())))
+
+    def test_rotated_png_is_decoded(self):
+        path = self._save("label.png", exif=self._rotated_exif())
+        with Image.open(path) as image:
+            # Pillow writes eXIf ahead of the pixel data, so it is read with the header
+            self.assertIn("exif", image.info)
+
+        self.assertFalse(self._can_send_raw(path))
+
+    def test_oversized_image_is_decoded(self):
+        self.assertFalse(self._can_send_raw(self._save("label.png", size=(1025, 600))))
+
+    def test_other_formats_are_decoded(self):
+        self.assertFalse(self._can_send_raw(self._save("label.bmp")))
+        self.assertFalse(self._can_send_raw(self._save("label.gif")))
+
+    def test_raw_payload_is_file_bytes(self):
+        path = self._save("label.jpg")
+
+        payload, scale = InferenceService._prepare_payload(path)
+
+        self.assertEqual(base64.b64decode(payload), path.read_bytes())
+        self.assertEqual(scale, 1.0)
+
+    def test_rotated_payload_is_re_encoded(self):
+        path = self._save("label.jpg", exif=self._rotated_exif())
+
+        payload, scale = InferenceService._prepare_payload(path)
+
+        # The API sees the pixels PIL decodes locally, without the rotation tag
+        with Image.open(BytesIO(base64.b64decode(payload))) as image:
+            self.assertEqual(image.size, (400, 600))
+            self.assertEqual(image.getexif().get(inference.EXIF_ORIENTATION, 1), 1)
+        self.assertEqual(scale, 1.0)
+
+
+class RescaleResultsTest(unittest.TestCase):
+    """Predictions on a downscaled payload map back to original coordinates."""
+
+    def setUp(self):
+        override_settings(self, max_infer_edge="1024")
+
+    def test_downscale_reports_scale(self):
+        image, scale = InferenceService._downscale(Image.new("RGB", (2048, 1000)))
+
+        self.assertEqual(scale, 0.5)
+        self.assertEqual(image.size, (1024, 500))
+
+    def test_small_image_is_not_downscaled(self):
+        original = Image.new("RGB", (800, 600))
+        image, scale = InferenceService._downscale(original)
+
+        self.assertIs(image, original)
+        self.assertEqual(scale, 1.0)
+
+    def test_rescale_maps_boxes_back(self):
+        results = {
+            "time": 0.1,
+            "predictions": [{"x": 100, "y": 50, "width": 40, "height": 60, "confidence": 0.9}]
+        }
+
+        rescaled = InferenceService._rescale_results(results, 0.5)
+
+        self.assertEqual(rescaled["time"], 0.1)
+        self.assertEqual(
+            rescaled["predictions"],
+            [{"x": 200, "y": 100, "width": 80, "height": 120, "confidence": 0.9}]
+        )
+        # The input, which may be a cached entry, is left untouched
+        self.assertEqual(results["predictions"][0]["x"], 100)
+
+    def test_rescale_is_identity_at_full_size(self):
+        results = {"predictions": [{"x": 1, "y": 2, "width": 3, "height": 4}]}
+        self.assertIs(InferenceService._rescale_results(results, 1.0), results)
+
+    def test_infer_image_returns_original_coordinates(self):
+        service = _service()
+        payload_results = {"predictions": [{"x": 512, "y": 250, "width": 400, "height": 200}]}
+
+        with mock.patch.object(service, "_post_image", return_value=payload_results):
+            results = service.infer_image(Image.new("RGB", (2048, 1000)))
+
+        self.assertEqual(
+            results["predictions"], [{"x": 1024, "y": 500, "width": 800, "height": 400}]
+        )
+
+
+class MinimumSizeTest(unittest.TestCase):
+    """Images too small to hold a label are rejected without calling the API."""
+
+    def setUp(self):
+        override_settings(self, min_infer_pixels=str(64 * 64))
+        self.service = _service()
+        patcher = mock.patch.object(self.service, "_post_image")
+        self.post_image = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_small_image_is_skipped(self):
+        with self.assertRaises(ValueError):
+            self.service.detect_labels(Image.new("RGB", (32, 32)))
+        self.post_image.assert_not_called()
+
+    def test_small_file_is_skipped(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "tiny.png"
+            Image.new("RGB", (32, 32)).save(path)
+
+            with self.assertRaises(ValueError):
+                self.service.detect_labels(path)
+        self.post_image.assert_not_called()
+
+    def test_large_enough_image_is_sent(self):
+        self.post_image.return_value = {"predictions": []}
+
+        with self.assertRaisesRegex(ValueError, "No shipping labels"):
+            self.service.detect_labels(Image.new("RGB", (64, 64)))
+        self.post_image.assert_called_once()
+
+
+class RequestLimiterTest(unittest.IsolatedAsyncioTestCase):
+    """Queued inferences wait without holding pool threads and give up slots on cancel."""
+
+    async def test_waiting_tasks_do_not_hold_pool_threads(self):
+        override_settings(self, max_workers="2", max_concurrent_inferences="1")
+        shutdown_executor()
+        self.addCleanup(shutdown_executor)
+        limiter = _service()._request_slots
+        limiter.acquire()
+
+        waiters = [asyncio.create_task(limiter.acquire_async()) for _ in range(4)]
+        await asyncio.sleep(0)
+        try:
+            # Unrelated blocking work still gets a thread right away
+            await asyncio.wait_for(run_blocking(lambda: None), timeout=1)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+            await asyncio.gather(*waiters, return_exceptions=True)
+
+    async def test_cancelled_waiter_gives_up_its_place(self):
+        limiter = RequestLimiter(1)
+        await limiter.acquire_async()
+        waiter = asyncio.create_task(limiter.acquire_async())
+        await asyncio.sleep(0)
+
+        waiter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter
+        limiter.release()
+
+        await asyncio.wait_for(limiter.acquire_async(), timeout=1)
+
+    async def test_cancel_after_handoff_returns_slot(self):
+        limiter = RequestLimiter(1)
+        await limiter.acquire_async()
+        waiter = asyncio.create_task(limiter.acquire_async())
+        await asyncio.sleep(0)
+
+        # The slot is handed to the waiter, which is cancelled before it resumes
+        limiter.release()
+        waiter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter
+
+        await asyncio.wait_for(limiter.acquire_async(), timeout=1)
+
+    async def test_threads_and_tasks_share_the_budget(self):
+        limiter = RequestLimiter(1)
+        await limiter.acquire_async()
+        acquired = threading.Event()
+
+        def use_slot():
+            with limiter:
+                acquired.set()
+
+        thread = threading.Thread(target=use_slot)
+        thread.start()
+        self.assertFalse(acquired.wait(0.05))
+
+        limiter.release()
+        thread.join(timeout=1)
+        self.assertTrue(acquired.is_set())
+        await asyncio.wait_for(limiter.acquire_async(), timeout=1)
+
+
+class WarmupTest(unittest.IsolatedAsyncioTestCase):
+    """Startup warms the async client without waiting long on an unreachable API."""
+
+    def _service_with_transport(self, handler) -> InferenceService:
+        service = _service()
+        service._async_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        self.addAsyncCleanup(service.aclose)
+        return service
+
+    async def test_warms_async_client(self):
+        requests = []
+
+        def handler(request):
+            requests.append(request.method)
+            return httpx.Response(200)
+
+        await self._service_with_transport(handler).warmup_async()
+
+        self.assertEqual(requests, ["HEAD"])
+
+    async def test_unreachable_api_does_not_hold_startup(self):
+        async def handler(request):
+            await asyncio.sleep(5)
+            return httpx.Response(200)
+
+        service = self._service_with_transport(handler)
+        started = time.monotonic()
+        with mock.patch.object(inference, "WARMUP_TIMEOUT", 0.05):
+            await service.warmup_async()
+
+        self.assertLess(time.monotonic() - started, 1)
+
+    async def test_aclose_closes_sync_session(self):
+        service = InferenceService(api_key="test-key", model_id="model/1")
+        with mock.patch.object(service.session, "close") as close:
+            await service.aclose()
+        close.assert_called_once()
+
+
+class AsyncRetryTest(unittest.IsolatedAsyncioTestCase):
+    """Image uploads retry throttling and gateway errors like the sync session."""
+
+    def _service(self, statuses):
+        self.statuses = list(statuses)
+        self.calls = 0
+
+        def handler(request):
+            self.calls += 1
+            status = self.statuses.pop(0)
+            return httpx.Response(status, headers={"Retry-After": "0"}, json={"predictions": []})
+
+        service = _service()
+        service._async_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        self.addAsyncCleanup(service.aclose)
+        return service
+
+    async def test_retries_throttled_request(self):
+        service = self._service([429, 503, 200])
+
+        self.assertEqual(await service._post_image_async(b"payload"), {"predictions": []})
+        self.assertEqual(self.calls, 3)
+
+    async def test_gives_up_after_retries(self):
+        service = self._service([502, 502, 502])
+
+        with self.assertRaises(inference.InferenceError):
+            await service._post_image_async(b"payload")
+        self.assertEqual(self.calls, 3)
+
+    async def test_client_errors_are_not_retried(self):
+        service = self._service([400])
+
+        with self.assertRaises(inference.InferenceError):
+            await service._post_image_async(b"payload")
+        self.assertEqual(self.calls, 1)
+
+    def test_backoff_without_retry_after(self):
+        response = httpx.Response(503)
+        self.assertEqual(InferenceService._retry_delay(response, 0), inference.RETRY_BACKOFF)
+        self.assertEqual(InferenceService._retry_delay(response, 1), inference.RETRY_BACKOFF * 2)
+
+
+class DetectLabelsBatchTest(unittest.TestCase):
+    """Batches keep input order, map missing labels to None and propagate real errors."""
+
+    def setUp(self):
+        override_settings(self, min_infer_pixels=str(64 * 64))
+        self.service = InferenceService(
+            api_key="test-key", model_id="model/1", reuse_session=False, batch_workers=3
+        )
+        self.addCleanup(asyncio.run, self.service.aclose())
+        self.label = {"x": 50, "y": 50, "width": 40, "height": 60, "confidence": 0.9}
+
+        def post_image(payload):
+            if self.fail:
+                raise inference.InferenceError("Inference request failed")
+            return {"predictions": [self.label] if payload in self.labelled else []}
+
+        self.fail = False
+        self.labelled = set()
+        patcher = mock.patch.object(self.service, "_post_image", side_effect=post_image)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _image(self, color, labelled=True):
+        image = Image.new("RGB", (100, 100), color)
+        if labelled:
+            self.labelled.add(InferenceService._prepare_payload(image)[0])
+        return image
+
+    def test_results_follow_input_order(self):
+        images = [self._image("red"), self._image("green", labelled=False), self._image("blue")]
+
+        results = self.service.detect_labels_batch(images)
+
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0], ([self.label], self.label))
+        self.assertIsNone(results[1])
+        self.assertEqual(results[2], ([self.label], self.label))
+
+    def test_small_image_yields_none(self):
+        results = self.service.detect_labels_batch([Image.new("RGB", (8, 8)), self._image("red")])
+
+        self.assertIsNone(results[0])
+        self.assertEqual(results[1], ([self.label], self.label))
+
+    def test_unsupported_input_propagates(self):
+        with self.assertRaisesRegex(ValueError, "Unsupported image input type"):
+            self.service.detect_labels_batch([self._image("red"), b"not an image"])
+
+    def test_request_failure_propagates(self):
+        self.fail = True
+        with self.assertRaises(inference.InferenceError):
+            self.service.detect_labels_batch([self._image("red"), self._image("blue")])
+
+    def test_serial_without_workers(self):
+        self.service.batch_workers = 1
+        results = self.service.detect_labels_batch([self._image("red")])
+
+        self.assertEqual(results, [([self.label], self.label)])
+        self.assertIsNone(self.service._batch_pool)
+
+
+if __name__ == "__main__":
+    unittest.main()
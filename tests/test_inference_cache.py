@@ -0,0 +1,104 @@
+"""
+Tests for the disk-backed inference result cache.
+"""
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from services.inference import InferenceCache
+
+
+RESULTS = {"predictions": [{"x": 10, "y": 20, "width": 40, "height": 60, "confidence": 0.9}]}
+
+
+class InferenceCacheTest(unittest.TestCase):
+    """Key stability, hits and misses, and size-based pruning."""
+
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = Path(self._temp_dir.name)
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def _entries(self) -> set[str]:
+        return {path.stem for path in self.cache_dir.glob("*.json")}
+
+    def _age(self, key: str, timestamp: float) -> None:
+        """Backdate an entry's last-used time."""
+        os.utime(self.cache_dir / f"{key}.json", (timestamp, timestamp))
+
+    def test_key_is_stable(self):
+        self.assertEqual(
+            InferenceCache.make_key(b"image", "model/1", "0.04"),
+            InferenceCache.make_key(b"image", "model/1", "0.04")
+        )
+
+    def test_key_depends_on_payload_and_parameters(self):
+        key = InferenceCache.make_key(b"image", "model/1", "0.04")
+        self.assertNotEqual(key, InferenceCache.make_key(b"other", "model/1", "0.04"))
+        self.assertNotEqual(key, InferenceCache.make_key(b"image", "model/2", "0.04"))
+        self.assertNotEqual(key, InferenceCache.make_key(b"image", "model/1", "0.5"))
+        # Parameters are delimited, so they can't run together
+        self.assertNotEqual(
+            InferenceCache.make_key(b"image", "ab", "c"),
+            InferenceCache.make_key(b"image", "a", "bc")
+        )
+
+    def test_miss_then_hit(self):
+        cache = InferenceCache(self.cache_dir, max_entries=8)
+        key = cache.make_key(b"image")
+
+        self.assertIsNone(cache.get(key))
+        cache.put(key, RESULTS)
+        self.assertEqual(cache.get(key), RESULTS)
+
+    def test_corrupt_entry_is_a_miss(self):
+        cache = InferenceCache(self.cache_dir, max_entries=8)
+        (self.cache_dir / "broken.json").write_text("{not json")
+
+        self.assertIsNone(cache.get("broken"))
+
+    def test_prunes_least_recently_used_beyond_margin(self):
+        cache = InferenceCache(self.cache_dir, max_entries=3)
+        keys = [f"key{i}" for i in range(10)]
+        for i, key in enumerate(keys):
+            cache.put(key, RESULTS)
+            self._age(key, 1000 + i)
+
+        entries = self._entries()
+        self.assertLessEqual(len(entries), cache.max_entries + cache._prune_margin)
+        self.assertIn(keys[-1], entries)
+        self.assertNotIn(keys[0], entries)
+
+    def test_get_marks_entry_as_recently_used(self):
+        cache = InferenceCache(self.cache_dir, max_entries=3)
+        for i, key in enumerate(["a", "b", "c"]):
+            cache.put(key, RESULTS)
+            self._age(key, 1000 + i)
+
+        cache.get("a")
+        # The margin allows one extra entry; the second put triggers a prune
+        cache.put("d", RESULTS)
+        cache.put("e", RESULTS)
+
+        entries = self._entries()
+        self.assertIn("a", entries)
+        self.assertNotIn("b", entries)
+
+    def test_put_does_not_rescan_below_margin(self):
+        cache = InferenceCache(self.cache_dir, max_entries=3)
+        cache.put("a", RESULTS)
+
+        # Files written behind the cache's back are only noticed by the next scan
+        for i in range(5):
+            (self.cache_dir / f"external{i}.json").write_text("{}")
+        cache.put("b", RESULTS)
+
+        self.assertEqual(len(self._entries()), 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
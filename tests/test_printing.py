@@ -0,0 +1,203 @@
+"""
+Tests for the print service's CUPS and print command paths.
+"""
+
+import subprocess
+import tempfile
+import types
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import services.printing as printing
+from services.printing import PrintService, PrintingError
+from tests.support import override_settings
+
+
+class FakeIPPError(Exception):
+    """Stands in for cups.IPPError, raised with (status, description)."""
+
+
+class FakeHTTPError(Exception):
+    """Stands in for cups.HTTPError, raised with an HTTP status."""
+
+
+IPP_SERVICE_UNAVAILABLE = 0x0502
+IPP_DOCUMENT_FORMAT_NOT_SUPPORTED = 0x040A
+
+
+class CupsPrintTest(unittest.TestCase):
+    """Only connection-level CUPS errors are retried or fall back to the print command."""
+
+    def setUp(self):
+        override_settings(self, print_command="auto", print_enabled="true")
+        self.connections = []
+        self.print_file_errors = []
+
+        def connect():
+            connection = mock.Mock()
+            connection.getDefault.return_value = "label-printer"
+            connection.printFile.side_effect = self._print_file
+            connection.createJob.return_value = 7
+            self.connections.append(connection)
+            return connection
+
+        fake_cups = types.SimpleNamespace(
+            Connection=connect,
+            IPPError=FakeIPPError,
+            HTTPError=FakeHTTPError,
+            IPP_SERVICE_UNAVAILABLE=IPP_SERVICE_UNAVAILABLE,
+            CUPS_FORMAT_AUTO="application/octet-stream"
+        )
+        patcher = mock.patch.object(printing, "cups", fake_cups)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.service = PrintService()
+        patcher = mock.patch.object(self.service, "_run_print_job", return_value=(True, "lp"))
+        self.run_print_job = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._temp_dir.cleanup)
+        self.label_path = Path(self._temp_dir.name) / "label.png"
+        self.label_path.write_bytes(b"png")
+
+    def _print_file(self, printer, path, title, options):
+        if self.print_file_errors:
+            raise self.print_file_errors.pop(0)
+        return 42
+
+    def test_submits_over_cups(self):
+        success, message = self.service.print_label_file(self.label_path)
+
+        self.assertTrue(success)
+        self.assertIn("Print job 42", message)
+        self.assertEqual(len(self.connections), 1)
+        self.run_print_job.assert_not_called()
+
+    def test_ipp_rejection_fails_without_retry_or_fallback(self):
+        self.print_file_errors = [
+            FakeIPPError(IPP_DOCUMENT_FORMAT_NOT_SUPPORTED, "document-format not supported")
+        ]
+
+        success, message = self.service.print_label_file(self.label_path)
+
+        self.assertFalse(success)
+        self.assertIn("document-format not supported", message)
+        self.assertEqual(len(self.connections), 1)
+        self.connections[0].printFile.assert_called_once()
+        self.run_print_job.assert_not_called()
+
+    def test_unexpected_error_is_not_resubmitted(self):
+        self.print_file_errors = [RuntimeError("timed out")]
+
+        success, _ = self.service.print_label_file(self.label_path)
+
+        self.assertFalse(success)
+        self.assertEqual(len(self.connections), 1)
+        self.run_print_job.assert_not_called()
+
+    def test_connection_error_reconnects_once(self):
+        self.print_file_errors = [FakeHTTPError(500)]
+
+        success, _ = self.service.print_label_file(self.label_path)
+
+        self.assertTrue(success)
+        self.assertEqual(len(self.connections), 2)
+        self.run_print_job.assert_not_called()
+
+    def test_service_unavailable_reconnects(self):
+        self.print_file_errors = [FakeIPPError(IPP_SERVICE_UNAVAILABLE, "cupsd restarting")]
+
+        success, _ = self.service.print_label_file(self.label_path)
+
+        self.assertTrue(success)
+        self.assertEqual(len(self.connections), 2)
+
+    def test_repeated_connection_errors_fall_back_to_print_command(self):
+        self.print_file_errors = [FakeHTTPError(500), FakeHTTPError(500)]
+
+        self.assertEqual(self.service.print_label_file(self.label_path), (True, "lp"))
+        self.run_print_job.assert_called_once_with([str(self.label_path)])
+
+        # CUPS is left alone until PRINT_SETUP_TTL has passed
+        self.service.print_label_file(self.label_path)
+        self.assertEqual(len(self.connections), 2)
+        self.assertEqual(self.run_print_job.call_count, 2)
+
+    def test_bytes_are_streamed_as_one_document(self):
+        success, message = self.service.print_label_bytes(b"png-data")
+
+        self.assertTrue(success)
+        self.assertIn("Print job 7", message)
+        connection = self.connections[0]
+        connection.writeRequestData.assert_called_once_with(b"png-data", 8)
+        connection.finishDocument.assert_called_once_with("label-printer")
+        connection.cancelJob.assert_not_called()
+
+    def test_rejected_bytes_job_is_cancelled(self):
+        def reject(*args):
+            raise FakeIPPError(IPP_DOCUMENT_FORMAT_NOT_SUPPORTED, "document-format not supported")
+
+        success, _ = self._print_bytes_with(startDocument=reject)
+
+        self.assertFalse(success)
+        self.connections[0].cancelJob.assert_called_once_with(7)
+        self.run_print_job.assert_not_called()
+
+    def _print_bytes_with(self, **side_effects):
+        connection = mock.Mock()
+        connection.getDefault.return_value = "label-printer"
+        connection.createJob.return_value = 7
+        for name, side_effect in side_effects.items():
+            getattr(connection, name).side_effect = side_effect
+        self.connections.append(connection)
+        with mock.patch.object(printing.cups, "Connection", return_value=connection):
+            return self.service.print_label_bytes(b"png-data")
+
+
+class PrintCommandBytesTest(unittest.TestCase):
+    """Without CUPS, labels held in memory are piped to the print command's stdin."""
+
+    def setUp(self):
+        override_settings(self, print_command="lp -d label-printer", print_enabled="true")
+        patcher = mock.patch.object(printing, "cups", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(
+            printing.subprocess, "run", return_value=subprocess.CompletedProcess([], 0, b"", b"")
+        )
+        self.run = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.service = PrintService()
+
+    def test_bytes_are_piped_to_stdin(self):
+        success, message = self.service.print_label_bytes(b"png-data")
+
+        self.assertTrue(success)
+        self.assertIn("lp -d label-printer", message)
+        self.run.assert_called_once()
+        args, kwargs = self.run.call_args
+        # No file argument: lp reads the job from stdin
+        self.assertEqual(args[0], ["lp", "-d", "label-printer"])
+        self.assertEqual(kwargs["input"], b"png-data")
+
+    def test_failed_command_is_reported(self):
+        self.run.side_effect = subprocess.CalledProcessError(1, ["lp"], stderr=b"no printer")
+
+        success, message = self.service.print_label_bytes(b"png-data")
+
+        self.assertFalse(success)
+        self.assertIn("exit code 1", message)
+
+    def test_disabled_printing_raises(self):
+        override_settings(self, print_enabled="false")
+
+        with self.assertRaises(PrintingError):
+            self.service.print_label_bytes(b"png-data")
+        self.run.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()